@@ -0,0 +1,95 @@
+"""
+Compact binary archive of a simulation result series.
+
+Archive is a directory of .npy files which can be memory-mapped:
+* points.npy -- node coordinates (nodes x 3)
+* connectivity.npy, offsets.npy, cell_types.npy -- static mesh cells
+* nt.npy -- nodal temperatures [K] (timesteps x nodes) float32
+* time.npy -- time of every time step [s] from .sta file
+"""
+
+from typing import NamedTuple
+from pathlib import Path
+import numpy as np
+import vtkmodules.all as vtk
+from vtkmodules.util import numpy_support
+import logging
+from postprocessing.create_csv import get_vtk_files
+from postprocessing.sta import get_timesteps
+from postprocessing.vtk_reader import VtkSeries
+
+log = logging.getLogger(__name__)
+
+
+class Archive(NamedTuple):
+    points: np.ndarray
+    connectivity: np.ndarray
+    offsets: np.ndarray
+    cell_types: np.ndarray
+    nt: np.ndarray
+    time: np.ndarray
+
+
+def get_mesh(grid: vtk.vtkUnstructuredGrid) -> dict[str, np.ndarray]:
+    """Get static mesh arrays of unstructured grid.
+
+    Keyword arguments:
+    grid -- unstructured grid
+    """
+    cells = grid.GetCells()
+    return {
+        "points": numpy_support.vtk_to_numpy(grid.GetPoints().GetData()),
+        "connectivity": numpy_support.vtk_to_numpy(cells.GetConnectivityArray()),
+        "offsets": numpy_support.vtk_to_numpy(cells.GetOffsetsArray()),
+        "cell_types": numpy_support.vtk_to_numpy(grid.GetCellTypesArray()),
+    }
+
+
+def build(vtk_directory: str, sta_file: str, output_dir: str) -> None:
+    """Build archive from .vtk series and .sta file.
+
+    Keyword arguments:
+    vtk_directory -- path to vtk directory
+    sta_file -- path to CalculiX sta file
+    output_dir -- path to archive directory
+    """
+    files = get_vtk_files(vtk_directory)
+    if not files:
+        raise FileNotFoundError(f"No .vtk files found in {vtk_directory}")
+    timesteps = get_timesteps(sta_file)
+    rows = min(len(files), len(timesteps))
+    if len(files) != len(timesteps):
+        log.warning(
+            f"{len(files)} .vtk files do not match {len(timesteps)} time steps "
+            f"in {sta_file}, archiving the first {rows} steps"
+        )
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    series = VtkSeries(files[:rows])
+    mesh = get_mesh(series.grid)
+    for name, array in mesh.items():
+        np.save(output_path / f"{name}.npy", array)
+    np.save(output_path / "time.npy", np.array(timesteps[:rows], dtype=np.float64))
+
+    nodes = len(mesh["points"])
+    nt = np.lib.format.open_memmap(
+        output_path / "nt.npy", mode="w+", dtype=np.float32, shape=(rows, nodes)
+    )
+    for idx, arrays in enumerate(series):
+        nt[idx] = arrays["NT"]
+    nt.flush()
+    del nt
+    log.info(f"Archived {rows} time steps of {nodes} nodes in {output_dir}")
+
+
+def load(archive_dir: str) -> Archive:
+    """Load archive, arrays are memory-mapped and read on access.
+
+    Keyword arguments:
+    archive_dir -- path to archive directory
+    """
+    path = Path(archive_dir)
+    return Archive(
+        *(np.load(path / f"{name}.npy", mmap_mode="r") for name in Archive._fields)
+    )
@@ -0,0 +1,501 @@
+"""
+Benchmark of the postprocessing hot paths on synthetic data.
+
+Synthetic .vtk series (ccx2paraview layout, tetrahedral mesh with NT point
+array) and .sta file are generated with the VTK Python API, so the benchmark
+runs without FreeCAD, CalculiX and ParaView. Every stage runs in a fresh
+process to measure how much it raises peak resident memory (Linux only).
+
+Startup of commands called from scripts is measured separately with
+python -X importtime against a time budget.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from importlib import metadata
+from pathlib import Path
+from typing import Callable
+import multiprocessing
+import numpy as np
+import vtkmodules.all as vtk
+from vtkmodules.util import numpy_support
+from postprocessing import create_csv
+from postprocessing import create_plot
+from postprocessing import sta
+from preprocessing import bisection
+import json
+import logging
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+log = logging.getLogger(__name__)
+
+MESH_NAME = "FEMMeshGmsh"
+
+# Module arguments of commands called from scripts and their startup budget [s]
+STARTUP_COMMANDS: dict[str, tuple[list[str], float]] = {
+    "tpost --help": (["postprocessing.main", "--help"], 0.5),
+    "tpre calc-coef": (
+        [
+            "preprocessing.main",
+            "calc-coef",
+            "--orientation",
+            "vertical",
+            "--temp-fluid",
+            "20",
+            "--temp-surface",
+            "60",
+            "--length",
+            "50",
+        ],
+        0.6,
+    ),
+}
+
+
+def create_grid(nodes: int) -> vtk.vtkUnstructuredGrid:
+    """Create tetrahedral mesh of a box with approximately the given node count.
+
+    Keyword arguments:
+    nodes -- requested number of nodes
+    """
+    side = max(2, round(nodes ** (1 / 3)))
+    image = vtk.vtkImageData()
+    image.SetDimensions(side, side, max(2, round(nodes / side**2)))
+    image.SetSpacing(1e-3, 1e-3, 1e-3)
+    triangulation = vtk.vtkDataSetTriangleFilter()
+    triangulation.SetInputData(image)
+    triangulation.Update()
+    return triangulation.GetOutput()
+
+
+def get_temperature(points: np.ndarray, step_time: float) -> np.ndarray:
+    """Get smooth synthetic temperature field heating up from a corner.
+
+    Keyword arguments:
+    points -- node coordinates
+    step_time -- simulated time [s]
+    """
+    distance = np.linalg.norm(points / points.max(axis=0), axis=1)
+    rise = 1.0 - math.exp(-step_time / 100.0)
+    return 293.15 + 120.0 * rise * np.exp(-2.0 * distance**2)
+
+
+def format_sta_value(value: float) -> str:
+    """Format value the way CalculiX writes .sta columns (Fortran E13.6).
+
+    Keyword arguments:
+    value -- non-negative value
+    """
+    if value == 0:
+        return "0.000000E+00".rjust(13)
+    exponent = math.floor(math.log10(value)) + 1
+    mantissa = f"{value / 10**exponent:.6f}"
+    if mantissa == "1.000000":
+        exponent += 1
+        mantissa = f"{value / 10**exponent:.6f}"
+    return f"{mantissa}E{exponent:+03d}".rjust(13)
+
+
+def write_sta(filename: str, steps: int, time_step: float = 1.0) -> None:
+    """Write .sta file with converged increments.
+
+    Keyword arguments:
+    filename -- path to .sta file
+    steps -- number of increments
+    time_step -- increment size [s]
+    """
+    with open(filename, "w") as f:
+        f.write("SUMMARY OF JOB INFORMATION\n")
+        f.write(
+            "  STEP      INC     ATT  ITRS     TOT TIME     STEP TIME         INC TIME\n"
+        )
+        for step in range(1, steps + 1):
+            step_time = step * time_step
+            values = (step_time, step_time, time_step)
+            f.write(f" {1:5d} {step:10d} {1:5d} {3:4d}")
+            f.write("".join(f" {format_sta_value(value)}" for value in values))
+            f.write("\n")
+
+
+def write_series(
+    vtk_directory: str, grid: vtk.vtkUnstructuredGrid, steps: int, time_step: float
+) -> None:
+    """Write .vtk series with the NT array stored as field data like ccx2paraview.
+
+    Mesh is formatted once and reused for every time step.
+
+    Keyword arguments:
+    vtk_directory -- path to vtk directory
+    grid -- mesh of the series
+    steps -- number of time steps
+    time_step -- time between steps [s]
+    """
+    os.makedirs(vtk_directory, exist_ok=True)
+    writer = vtk.vtkUnstructuredGridWriter()
+    writer.SetInputData(grid)
+    writer.SetWriteToOutputString(True)
+    writer.Write()
+    geometry = writer.GetOutputString()
+    points = numpy_support.vtk_to_numpy(grid.GetPoints().GetData())
+    nodes = len(points)
+    width = len(str(steps))
+    for step in range(1, steps + 1):
+        temperature = get_temperature(points, step * time_step)
+        full = nodes - nodes % 9
+        filename = f"{vtk_directory}/{MESH_NAME}.{step:0{width}d}.vtk"
+        with open(filename, "w") as f:
+            f.write(geometry)
+            f.write(f"POINT_DATA {nodes}\nFIELD FieldData 1\nNT 1 {nodes} double\n")
+            np.savetxt(f, temperature[:full].reshape(-1, 9), fmt="%.11g")
+            if full < nodes:
+                np.savetxt(f, temperature[full:].reshape(1, -1), fmt="%.11g")
+
+
+def generate(workdir: str, nodes: int, steps: int, time_step: float = 1.0) -> int:
+    """Generate synthetic simulation output, returns the actual number of nodes.
+
+    Keyword arguments:
+    workdir -- path to working directory
+    nodes -- requested number of nodes
+    steps -- number of time steps
+    time_step -- time between steps [s]
+    """
+    grid = create_grid(nodes)
+    write_series(f"{workdir}/vtk", grid, steps, time_step)
+    write_sta(f"{workdir}/{MESH_NAME}.sta", steps, time_step)
+    return grid.GetNumberOfPoints()
+
+
+def run_csv(workdir: str, jobs: int) -> None:
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        create_csv.main(
+            f"{workdir}/vtk",
+            f"{workdir}/{MESH_NAME}.sta",
+            f"{workdir}/temperature.csv",
+            jobs,
+        )
+
+
+def run_plot(workdir: str, jobs: int) -> None:
+    # Missing style fonts are reported for every text element
+    logging.getLogger("matplotlib.font_manager").setLevel(logging.ERROR)
+    create_plot.main(f"{workdir}/temperature.csv", f"{workdir}/graphs")
+
+
+def run_timesteps(workdir: str, jobs: int) -> None:
+    sta.get_timesteps(f"{workdir}/{MESH_NAME}.sta")
+
+
+def run_bisect(workdir: str, jobs: int) -> None:
+    config = f"{workdir}/config.json"
+    with open(config, "w") as f:
+        json.dump({"temperature": {"min": 20, "max": 160, "tolerance": 2}}, f)
+    os.environ.update({"ITERATION": "1", "TMIN": "20", "TMAX": "160"})
+    try:
+        bisection.bisect_temperature(config, f"{workdir}/temperature.csv")
+    except SystemExit:
+        pass
+
+
+# Stages in execution order, later stages read the output of the earlier ones
+STAGES: dict[str, Callable[[str, int], None]] = {
+    "csv": run_csv,
+    "plot": run_plot,
+    "get_timesteps": run_timesteps,
+    "bisect": run_bisect,
+}
+
+
+def read_memory_status(field: str) -> int:
+    """Read memory field of the process status, e.g. VmRSS [kB]."""
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1])
+    raise Exception(f"{field} not in /proc/self/status")
+
+
+def measure(stage: str, workdir: str, jobs: int) -> tuple[float, float, float | None]:
+    """Run stage, returns elapsed time [s] and memory of this process and workers.
+
+    Peak memory reached while importing modules is reset before the stage,
+    the increase is measured over resident memory at its start [MB].
+    Workers are reported separately with the peak resident memory of the largest
+    one [MB], None if the stage started no worker processes.
+
+    Keyword arguments:
+    stage -- name of the stage
+    workdir -- path to working directory
+    jobs -- number of worker processes
+    """
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    before = read_memory_status("VmRSS")
+    start = time.perf_counter()
+    STAGES[stage](workdir, jobs)
+    elapsed = time.perf_counter() - start
+    increase = max(0, read_memory_status("VmHWM") - before) / 1024
+    # Stage runs in a fresh process, so only its own workers were reaped,
+    # ru_maxrss is in kB
+    workers = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return elapsed, increase, workers / 1024 if workers else None
+
+
+def run(nodes: int, steps: int, workdir: str, jobs: int = 1, repeat: int = 1) -> dict:
+    """Generate data and benchmark all stages.
+
+    Keyword arguments:
+    nodes -- requested number of nodes
+    steps -- number of time steps
+    workdir -- path to working directory
+    jobs -- number of processes used by tpost csv
+    repeat -- number of runs of every stage, the fastest is reported
+    """
+    start = time.perf_counter()
+    nodes = generate(workdir, nodes, steps)
+    elapsed = time.perf_counter() - start
+    log.info(f"Generated {steps} steps of {nodes} nodes in {elapsed:.2f} s")
+    stages: dict[str, dict[str, float | None]] = {
+        "generate": {
+            "seconds": elapsed,
+            "peak_rss_increase_mb": None,
+            "worker_peak_rss_mb": None,
+        }
+    }
+
+    # Fresh process for every run, so peak memory of a stage is not hidden
+    # by the peak of a previous one
+    context = multiprocessing.get_context("spawn")
+    for stage in STAGES:
+        runs = []
+        for _ in range(repeat):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                runs.append(executor.submit(measure, stage, workdir, jobs).result())
+        seconds = min(run[0] for run in runs)
+        workers = [run[2] for run in runs if run[2] is not None]
+        stages[stage] = {
+            "seconds": seconds,
+            "peak_rss_increase_mb": max(run[1] for run in runs),
+            "worker_peak_rss_mb": max(workers) if workers else None,
+        }
+        log.info(f"{stage}: {seconds:.3f} s")
+    for result in stages.values():
+        elapsed = result["seconds"] or 0.0
+        result["throughput"] = nodes * steps / elapsed if elapsed > 0 else None
+
+    try:
+        version = metadata.version("tmake")
+    except metadata.PackageNotFoundError:
+        version = None
+    return {
+        "version": version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "nodes": nodes,
+        "steps": steps,
+        "jobs": jobs,
+        "stages": stages,
+    }
+
+
+def main(
+    nodes: list[int],
+    steps: list[int],
+    output_file: str,
+    jobs: int = 1,
+    repeat: int = 1,
+    workdir: str | None = None,
+) -> None:
+    """Benchmark every combination of node and step counts and save results as json.
+
+    Keyword arguments:
+    nodes -- requested numbers of nodes
+    steps -- numbers of time steps
+    output_file -- path to output file (.json)
+    jobs -- number of processes used by tpost csv
+    repeat -- number of runs of every stage, the fastest is reported
+    workdir -- (optional) path to keep generated data, temporary directory by default
+    """
+    results = []
+    for node_count in nodes:
+        for step_count in steps:
+            if workdir:
+                directory = f"{workdir}/{node_count}x{step_count}"
+                Path(directory).mkdir(parents=True, exist_ok=True)
+                results.append(run(node_count, step_count, directory, jobs, repeat))
+                continue
+            with tempfile.TemporaryDirectory() as tmp:
+                results.append(run(node_count, step_count, tmp, jobs, repeat))
+    with open(output_file, "w") as f:
+        json.dump(results, f, indent=4)
+    log.info(f"Benchmark results saved in {output_file}")
+
+
+def parse_importtime(output: str, top: int = 5) -> tuple[float, dict[str, float]]:
+    """Parse python -X importtime report.
+
+    Returns total import time [s] and cumulative import time [s]
+    of the slowest top level imports.
+
+    Keyword arguments:
+    output -- stderr of the process
+    top -- number of reported top level imports
+    """
+    total = 0.0
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        total += int(fields[0]) / 1e6
+        # Nested imports are indented by two spaces per level
+        name = fields[2][1:]
+        if not name.startswith(" "):
+            modules[name] = int(fields[1]) / 1e6
+    slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)
+    return total, dict(slowest[:top])
+
+
+def measure_startup(args: list[str], repeat: int = 5) -> dict:
+    """Run python module in a fresh interpreter, the fastest run is reported.
+
+    Keyword arguments:
+    args -- module name and its arguments
+    repeat -- number of runs
+    """
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", *args],
+            capture_output=True,
+            text=True,
+            cwd=tempfile.gettempdir(),
+        )
+        elapsed = time.perf_counter() - start
+        if process.returncode != 0:
+            raise Exception(f"{' '.join(args)} failed:\n{process.stderr}")
+        runs.append((elapsed, process.stderr))
+    elapsed, output = min(runs, key=lambda run: run[0])
+    imports, modules = parse_importtime(output)
+    return {"seconds": elapsed, "import_seconds": imports, "slowest_imports": modules}
+
+
+def main_startup(output_file: str, repeat: int = 5) -> bool:
+    """Measure startup of commands called from scripts and save results as json.
+
+    Returns True if every command fits in its budget.
+
+    Keyword arguments:
+    output_file -- path to output file (.json)
+    repeat -- number of runs of every command, the fastest is reported
+    """
+    results = {}
+    passed = True
+    for command, (args, budget) in STARTUP_COMMANDS.items():
+        result = measure_startup(args, repeat)
+        result["budget"] = budget
+        results[command] = result
+        imports = ", ".join(
+            f"{name} {seconds:.3f} s"
+            for name, seconds in result["slowest_imports"].items()
+        )
+        message = (
+            f"{command}: {result['seconds']:.3f} s (budget {budget} s)"
+            f", slowest imports: {imports}"
+        )
+        if result["seconds"] > budget:
+            log.error(message)
+            passed = False
+        else:
+            log.info(message)
+    with open(output_file, "w") as f:
+        json.dump(results, f, indent=4)
+    log.info(f"Startup results saved in {output_file}")
+    return passed
+
+
+def write_csv(filename: str, rows: int, time_step: float = 1.0) -> None:
+    """Write temperature csv in the tpost csv layout with a synthetic curve.
+
+    Keyword arguments:
+    filename -- path to csv file
+    rows -- number of time steps
+    time_step -- time between steps [s]
+    """
+    time = np.arange(1, rows + 1) * time_step
+    rise = 1.0 - np.exp(-time / (rows * time_step / 5))
+    maximum = 293.15 + 120.0 * rise
+    minimum = 293.15 + 60.0 * rise
+    columns = {"time [s]": time}
+    for stat, kelvin in (("max", maximum), ("min", minimum)):
+        columns[f"{stat} [K]"] = kelvin
+        columns[f"{stat} [C]"] = kelvin - 273.15
+        columns[f"{stat} [F]"] = (kelvin - 273.15) * 1.8 + 32
+    header = ",".join(columns)
+    np.savetxt(
+        filename,
+        np.column_stack(list(columns.values())),
+        delimiter=",",
+        header=header,
+        comments="",
+        fmt="%.6f",
+    )
+
+
+def time_plots(data_file: str, output_dir: str, jobs: int | None) -> float:
+    """Render all temperature plots, returns elapsed time [s].
+
+    Keyword arguments:
+    data_file -- path to csv file
+    output_dir -- path to graph directory
+    jobs -- number of processes of the renderer, None renders every plot
+            with a new figure like before the renderer
+    """
+    start = time.perf_counter()
+    if jobs is None:
+        sim_data = create_plot.read_simulation_data(data_file)
+        for temperature, x, title, unit in create_plot.get_plots(sim_data):
+            create_plot.plot(temperature, x, title, unit, output_dir)
+    else:
+        create_plot.main(data_file, output_dir, jobs=jobs)
+    return time.perf_counter() - start
+
+
+def main_plot(rows: int, jobs: list[int], output_file: str, repeat: int = 1) -> None:
+    """Benchmark rendering of tpost plot graphs and save results as json.
+
+    Keyword arguments:
+    rows -- number of csv rows
+    jobs -- numbers of renderer processes
+    output_file -- path to output file (.json)
+    repeat -- number of runs of every variant, the fastest is reported
+    """
+    # Missing style fonts are reported for every text element
+    logging.getLogger("matplotlib.font_manager").setLevel(logging.ERROR)
+    timings: dict[str, dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = f"{tmp}/temperature.csv"
+        write_csv(data_file, rows)
+        variants: dict[str, int | None] = {"figure per plot": None}
+        variants.update({f"renderer, {count} jobs": count for count in jobs})
+        for name, count in variants.items():
+            seconds = min(
+                time_plots(data_file, f"{tmp}/graphs", count) for _ in range(repeat)
+            )
+            timings[name] = {"seconds": seconds}
+            log.info(f"{name}: {seconds:.3f} s")
+    results = {"rows": rows, "cpus": os.cpu_count(), "variants": timings}
+    with open(output_file, "w") as f:
+        json.dump(results, f, indent=4)
+    log.info(f"Plot benchmark results saved in {output_file}")
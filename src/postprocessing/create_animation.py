@@ -1,14 +1,26 @@
 import paraview.simple as pvs
 import paraview.servermanager
 from pathlib import Path
+import argparse
 import os
 import glob
+import subprocess
 import pandas as pd
 import numpy as np
 from enum import Enum, auto
+from typing import IO
+from vtkmodules.vtkRenderingCore import vtkWindowToImageFilter
+from vtkmodules.util.numpy_support import vtk_to_numpy
 
 output_path = Path.cwd()  # animation frames output path
 
+FRAME_SIZE = 2048  # width and height of frames [px]
+# ffmpeg encoder arguments of video formats
+VIDEO_CODECS = {
+    "mp4": ["-c:v", "libx264", "-crf", "20", "-movflags", "+faststart"],
+    "webm": ["-c:v", "libvpx-vp9", "-crf", "32", "-b:v", "0", "-row-mt", "1"],
+}
+
 
 class ViewType(Enum):
     ISO = auto()
@@ -19,6 +31,9 @@ class ViewType(Enum):
     SIDE = auto()
 
 
+DEFAULT_VIEWS = (ViewType.ISO, ViewType.TOP, ViewType.BOTTOM)
+
+
 def get_vtk_files() -> list[str]:
     """Get list of .vtk files."""
     files = sorted([file for file in glob.glob("vtk/*.vtk")])
@@ -60,6 +75,7 @@ def render_views(
     output_dir: str,
     render_view: paraview.servermanager.Proxy,
     idx: int,
+    encoders: dict[ViewType, subprocess.Popen] | None = None,
 ) -> None:
     """Render specific view frame.
 
@@ -68,6 +84,7 @@ def render_views(
     output_dir -- path to output dir
     render_view -- render view object
     idx -- frame number
+    encoders -- ffmpeg processes of views, frames are saved as PNG if not given
     """
     for view in views:
 
@@ -76,16 +93,131 @@ def render_views(
 
         layout = pvs.GetLayout()
 
-        layout.SetSize(2048, 2048)
+        layout.SetSize(FRAME_SIZE, FRAME_SIZE)
+
+        if encoders is None:
+            pvs.SaveScreenshot(f"{output_dir}/{view.name}_{idx:06d}.png", render_view)
+        else:
+            get_pipe(encoders[view]).write(capture_frame(render_view))
+
+
+def capture_frame(render_view: paraview.servermanager.Proxy) -> bytes:
+    """Render view and get the frame as raw RGB bytes, top row first.
+
+    Keyword arguments:
+    render_view -- render view object
+    """
+    render_view.ViewSize = [FRAME_SIZE, FRAME_SIZE]
+    pvs.Render(render_view)
+    capture = vtkWindowToImageFilter()
+    capture.SetInput(render_view.GetRenderWindow())
+    capture.SetInputBufferTypeToRGB()
+    capture.ReadFrontBufferOff()
+    capture.Update()
+    image = capture.GetOutput()
+    width, height, _ = image.GetDimensions()
+    if (width, height) != (FRAME_SIZE, FRAME_SIZE):
+        raise Exception(f"Captured frame is {width}x{height}, expected {FRAME_SIZE}")
+    pixels = vtk_to_numpy(image.GetPointData().GetScalars())
+    # VTK images start with the bottom row
+    pixels = pixels.reshape(height, width, 3)[::-1]
+    return np.ascontiguousarray(pixels, dtype=np.uint8).tobytes()
+
+
+def open_encoder(filename: str, video_format: str, fps: int) -> subprocess.Popen:
+    """Start ffmpeg encoding raw RGB frames read from stdin.
+
+    Keyword arguments:
+    filename -- path to video file
+    video_format -- one of VIDEO_CODECS
+    fps -- frames per second
+    """
+    return subprocess.Popen(
+        [
+            "ffmpeg",
+            "-y",
+            "-loglevel",
+            "error",
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            "rgb24",
+            "-s",
+            f"{FRAME_SIZE}x{FRAME_SIZE}",
+            "-framerate",
+            str(fps),
+            "-i",
+            "-",
+            *VIDEO_CODECS[video_format],
+            "-pix_fmt",
+            "yuv420p",
+            filename,
+        ],
+        stdin=subprocess.PIPE,
+    )
+
+
+def get_pipe(encoder: subprocess.Popen) -> IO[bytes]:
+    """Get stdin of ffmpeg process, frames are written to it."""
+    if encoder.stdin is None:
+        raise Exception("ffmpeg started without stdin pipe")
+    return encoder.stdin
+
+
+def close_encoders(encoders: dict[ViewType, subprocess.Popen]) -> None:
+    """Finish videos and check that every ffmpeg process succeeded."""
+    for encoder in encoders.values():
+        get_pipe(encoder).close()
+    failed = [view.name for view, encoder in encoders.items() if encoder.wait() != 0]
+    if failed:
+        raise Exception(f"ffmpeg failed to encode {', '.join(failed)} videos")
+
+
+def get_video_name(
+    output_dir: str, view: ViewType, video_format: str, worker: int, workers: int
+) -> str:
+    """Get path to video of a view, workers write numbered segments.
+
+    Keyword arguments:
+    output_dir -- path to output dir
+    view -- rendered view
+    video_format -- one of VIDEO_CODECS
+    worker -- index of the worker
+    workers -- number of workers
+    """
+    if workers == 1:
+        return f"{output_dir}/{view.name}.{video_format}"
+    return f"{output_dir}/{view.name}_{worker:03d}.{video_format}"
+
 
-        pvs.SaveScreenshot(f"{output_dir}/{view.name}_{idx:06d}.png", render_view)
+def get_frames(end_time: int, worker: int, workers: int) -> range:
+    """Get contiguous slice of frames rendered by a worker.
+
+    Keyword arguments:
+    end_time -- number of frames
+    worker -- index of the worker
+    workers -- number of workers
+    """
+    return range(end_time * worker // workers, end_time * (worker + 1) // workers)
 
 
-def make_previews(files: list[str]) -> None:
-    """Prepare render view.
+def make_previews(
+    files: list[str],
+    worker: int = 0,
+    workers: int = 1,
+    video_format: str = "png",
+    fps: int = 5,
+    views: tuple[ViewType, ...] = DEFAULT_VIEWS,
+) -> None:
+    """Prepare render view and render frames of the worker.
 
     Keyword arguments:
     files -- list of vtk files
+    worker -- index of the worker
+    workers -- number of workers splitting the frames
+    video_format -- "png" for frame images or one of VIDEO_CODECS
+    fps -- frames per second of videos
+    views -- rendered views
     """
     vtk_reader = pvs.LegacyVTKReader(registrationName="Simulation", FileNames=files)
 
@@ -110,22 +242,60 @@ def make_previews(files: list[str]) -> None:
     scene = pvs.GetAnimationScene()
     end_time = int(scene.EndTime) + 1
 
-    if not os.path.exists("animations"):
-        os.makedirs("animations")
+    os.makedirs("animations", exist_ok=True)
+
+    encoders = None
+    if video_format != "png":
+        encoders = {
+            view_type: open_encoder(
+                get_video_name("animations", view_type, video_format, worker, workers),
+                video_format,
+                fps,
+            )
+            for view_type in views
+        }
 
-    for idx in range(0, end_time):
-        animation.AnimationTime = idx
-        render_views(
-            [ViewType.ISO, ViewType.TOP, ViewType.BOTTOM], "animations", view, idx
-        )
+    try:
+        for idx in get_frames(end_time, worker, workers):
+            animation.AnimationTime = idx
+            render_views(list(views), "animations", view, idx, encoders)
+    finally:
+        if encoders is not None:
+            close_encoders(encoders)
 
 
 def main() -> None:
     """Main script function."""
+    parser = argparse.ArgumentParser(description="Render animation frames")
+    parser.add_argument("--worker", type=int, default=0, help="Index of the worker")
+    parser.add_argument("--workers", type=int, default=1, help="Number of workers")
+    parser.add_argument(
+        "--format",
+        choices=["png", *VIDEO_CODECS],
+        default="png",
+        help="PNG frames or video encoded by ffmpeg",
+    )
+    parser.add_argument("--fps", type=int, default=5, help="Frames per second")
+    parser.add_argument(
+        "--views",
+        nargs="+",
+        choices=[view.name for view in ViewType],
+        default=[view.name for view in DEFAULT_VIEWS],
+        help="Rendered views",
+    )
+    args = parser.parse_args()
+
     paraview.simple._DisableFirstRenderCameraReset()
 
     files = get_vtk_files()
-    make_previews(files)
+    make_previews(
+        files,
+        args.worker,
+        args.workers,
+        args.format,
+        args.fps,
+        tuple(ViewType[view] for view in args.views),
+    )
 
     print("DONE")
 
@@ -1,9 +1,25 @@
-import vtkmodules.all as vtk
-from vtkmodules.util import numpy_support
+from postprocessing.vtk_reader import find_array_id_by_name  # noqa: F401
+from postprocessing.vtk_reader import read_point_array, read_point_arrays, VtkSeries
+from postprocessing.frd_reader import read_frd
+from postprocessing import statistics
+from postprocessing import regions
+from postprocessing.sta import get_timesteps
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
 import glob
+import json
+import logging
+import os
+import time
 import pandas as pd
 import typer
 
+log = logging.getLogger(__name__)
+
+# Bump when the layout of cached statistics changes
+CACHE_VERSION = 1
+
 
 def get_vtk_files(vtk_directory: str) -> list[str]:
     """Get list of .vtk files.
@@ -15,86 +31,310 @@ def get_vtk_files(vtk_directory: str) -> list[str]:
     return files
 
 
-def get_timesteps(filename: str) -> list[str]:
-    """Get timesteps from .sta file.
+def read_temperature(filename: str) -> np.ndarray:
+    """Read nodal temperature array from .vtk file.
 
-    Keyword arguments
-    filename -- path to .sta file
+    Keyword arguments:
+    filename -- path to .vtk file
     """
-    timesteps = []
-    with open(filename) as f:
-        lines = f.readlines()
-        del lines[0]
-        del lines[0]
-        for line in lines:
-            splited_line = line.split(" ")
-            convergence = "".join(splited_line[-12:-10]).isnumeric()
-            step = splited_line[-5:-4][0]
-            if convergence:  # in some case time step entry can be duplicated
-                timesteps.append(step)
-    return timesteps
-
-
-def find_array_id_by_name(point_data: vtk.vtkPointData, name: str) -> int | None:
-    """Find array id by array name.
+    return read_point_array(filename, "NT")
+
+
+def reduce_temperature(
+    filename: str,
+    stats: tuple[str, ...] = (),
+    weights: np.ndarray | None = None,
+    fingerprint: tuple[int, str] | None = None,
+    region_index: regions.RegionIndex | None = None,
+) -> tuple[dict[str, np.generic], float]:
+    """Get temperature statistics of a single .vtk file.
+
+    Returns statistics by name and the reduction time in seconds.
 
     Keyword arguments:
-    point_data -- vtk unstructured grid data
-    name -- name of the array to find
+    filename -- path to .vtk file
+    stats -- names of optional statistics
+    weights -- normalized nodal volume weights
+    fingerprint -- (optional) geometry fingerprint the file has to match
+    region_index -- (optional) point indices of regions
     """
-    for id in range(0, point_data.GetNumberOfArrays()):
-        if point_data.GetArrayName(id) == name:
-            return id
-    return None
+    start = time.perf_counter()
+    if fingerprint is None:
+        array = read_temperature(filename)
+    else:
+        array = read_point_arrays(filename, ("NT",), fingerprint)["NT"]
+    result = statistics.compute(array, stats, weights)
+    if region_index is not None:
+        result.update(regions.compute(array, region_index))
+    return result, time.perf_counter() - start
 
 
-def main(vtk_directory: str, sta_file: str, output_file: str) -> None:
-    """Main script function.
+def reduce_files(
+    files: list[str],
+    jobs: int = 1,
+    stats: tuple[str, ...] = (),
+    weights: np.ndarray | None = None,
+    fingerprint: tuple[int, str] | None = None,
+    region_index: regions.RegionIndex | None = None,
+) -> list[tuple[dict[str, np.generic], float]]:
+    """Reduce .vtk files to temperature statistics, keeping the order of files.
+
+    Keyword arguments:
+    files -- list of .vtk files
+    jobs -- number of worker processes, 0 uses all available CPUs
+    stats -- names of optional statistics
+    weights -- normalized nodal volume weights
+    fingerprint -- (optional) geometry fingerprint the files have to match
+    region_index -- (optional) point indices of regions
+    """
+    reduce = partial(
+        reduce_temperature,
+        stats=stats,
+        weights=weights,
+        fingerprint=fingerprint,
+        region_index=region_index,
+    )
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if jobs == 1 or len(files) < 2:
+        return [reduce(filename) for filename in files]
+    chunksize = max(1, len(files) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(reduce, files, chunksize=chunksize))
+
+
+def load_cache(cache_file: str) -> dict:
+    """Load per-file statistics cache, an empty cache is returned if it is unusable.
+
+    Keyword arguments:
+    cache_file -- path to cache file (.json)
+    """
+    try:
+        with open(cache_file, "r") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("version") != CACHE_VERSION:
+        return {}
+    return cache["files"]
+
+
+def save_cache(entries: dict, cache_file: str) -> None:
+    """Save per-file statistics cache.
+
+    Keyword arguments:
+    entries -- cache entries by file path
+    cache_file -- path to cache file (.json)
+    """
+    with open(cache_file, "w") as f:
+        json.dump({"version": CACHE_VERSION, "files": entries}, f)
+
+
+def get_cache_entry(
+    filename: str, cache: dict, stats: tuple[str, ...] = ()
+) -> dict | None:
+    """Get cache entry of a file if the file did not change since it was cached.
+
+    Keyword arguments:
+    filename -- path to .vtk file
+    cache -- cache entries by file path
+    stats -- names of optional statistics the entry has to contain
+    """
+    entry = cache.get(os.path.abspath(filename))
+    if entry is None or not set(stats) <= entry["stats"].keys():
+        return None
+    stat = os.stat(filename)
+    if entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime_ns:
+        return None
+    return entry
+
+
+def make_cache_entry(filename: str, stats: dict[str, np.generic]) -> dict:
+    """Create cache entry with file size, modification time and its statistics.
+
+    Keyword arguments:
+    filename -- path to .vtk file
+    stats -- statistics by name
+    """
+    stat = os.stat(filename)
+    return {
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "stats": {
+            name: [value.item(), value.dtype.str] for name, value in stats.items()
+        },
+    }
+
+
+def decode_stats(entry: dict) -> dict[str, np.generic]:
+    """Restore statistics from cache entry with their original types.
+
+    Keyword arguments:
+    entry -- cache entry
+    """
+    return {
+        name: np.dtype(dtype).type(value)
+        for name, (value, dtype) in entry["stats"].items()
+    }
+
+
+def collect_vtk_stats(
+    vtk_directory: str,
+    jobs: int = 1,
+    cache_file: str | None = None,
+    stats: tuple[str, ...] = (),
+    region_index: regions.RegionIndex | None = None,
+) -> list[dict[str, np.generic]]:
+    """Get temperature statistics of every .vtk file in time step order.
 
     Keyword arguments:
     vtk_directory -- path to vtk directory
-    sta_file -- path to CalculiX sta file
-    output_file -- path to output csv file
+    jobs -- number of worker processes reducing .vtk files
+    cache_file -- (optional) path to per-file statistics cache
+    stats -- names of optional statistics
+    region_index -- (optional) point indices of regions
     """
-    max_K = []
-    min_K = []
-    max_C = []
-    min_C = []
-    max_F = []
-    min_F = []
     files = get_vtk_files(vtk_directory)
+    cache = load_cache(cache_file) if cache_file else {}
+    required = stats
+    if region_index is not None:
+        required += tuple(regions.get_stat_names(region_index))
+    entries = {}
+    stale = []
     for filename in files:
-        reader = vtk.vtkUnstructuredGridReader()
-        reader.SetFileName(filename)
-        reader.Update()
-        point_data = reader.GetOutput().GetPointData()
-        nt_id = find_array_id_by_name(point_data, "NT")
-        nt = reader.GetOutput().GetPointData().GetArray(nt_id)
-
-        array = numpy_support.vtk_to_numpy(nt)
+        entry = get_cache_entry(filename, cache, required)
+        if entry is None:
+            stale.append(filename)
+        else:
+            entries[os.path.abspath(filename)] = entry
+    if cache_file:
+        log.info(f"Reusing {len(files) - len(stale)} cached results from {cache_file}")
+
+    # Mesh does not change between time steps, volumes are computed once
+    # and every file is checked to have the same geometry
+    weights = None
+    fingerprint = None
+    if "wmean" in stats and stale:
+        series = VtkSeries(stale)
+        weights = statistics.get_nodal_weights(series.grid)
+        fingerprint = series.fingerprint
+
+    start = time.perf_counter()
+    results = reduce_files(stale, jobs, stats, weights, fingerprint, region_index)
+    elapsed = time.perf_counter() - start
+    for filename, (result, _) in zip(stale, results):
         print(f"file: {filename}")
-        print(f"max: {array.max()} K")
-        print(f"min: {array.min()} K")
-        max_K.append(array.max())
-        max_C.append(array.max() - 273.15)
-        min_K.append(array.min())
-        min_C.append(array.min() - 273.15)
-        max_F.append((array.max() - 273.15) * 1.8 + 32)
-        min_F.append((array.min() - 273.15) * 1.8 + 32)
+        print(f"max: {result['max']} K")
+        print(f"min: {result['min']} K")
+        entries[os.path.abspath(filename)] = make_cache_entry(filename, result)
+    if cache_file:
+        save_cache(entries, cache_file)
+
+    # Sum of per-file reduction times is the cost of the sequential path
+    sequential = sum(result[1] for result in results)
+    if elapsed > 0 and results:
+        print(
+            f"Reduced {len(stale)} files in {elapsed:.2f} s "
+            f"(sequential {sequential:.2f} s, speedup x{sequential / elapsed:.2f})"
+        )
+    return [decode_stats(entries[os.path.abspath(filename)]) for filename in files]
+
+
+def collect_frd_stats(
+    frd_file: str,
+    stats: tuple[str, ...] = (),
+    region_index: regions.RegionIndex | None = None,
+) -> list[dict[str, np.generic]]:
+    """Get temperature statistics of every time step stored in .frd file.
+
+    Keyword arguments:
+    frd_file -- path to CalculiX result file
+    stats -- names of optional statistics
+    region_index -- (optional) point indices of regions
+    """
+    if "wmean" in stats:
+        raise ValueError("Volume-weighted mean requires .vtk files")
+    results = []
+    for step_time, array in read_frd(frd_file):
+        result = statistics.compute(array, stats)
+        if region_index is not None:
+            result.update(regions.compute(array, region_index))
+        print(f"time: {step_time} s")
+        print(f"max: {result['max']} K")
+        print(f"min: {result['min']} K")
+        results.append(result)
+    return results
+
+
+def get_node_numbers(inp_file: str, indices: list) -> list[int]:
+    """Map point indices to CalculiX node numbers.
+
+    Keyword arguments:
+    inp_file -- path to CalculiX input file of the simulated mesh
+    indices -- point indices in ascending node number order
+    """
+    nodes = regions.read_node_numbers(inp_file)
+    indices_array = np.asarray(indices, dtype=np.int64)
+    if len(indices_array) and indices_array.max() >= len(nodes):
+        raise ValueError(f"Results have more points than {len(nodes)} nodes of .inp")
+    return nodes[indices_array].tolist()
+
+
+def main(
+    vtk_directory: str,
+    sta_file: str,
+    output_file: str,
+    jobs: int = 1,
+    cache_file: str | None = None,
+    frd_file: str | None = None,
+    stats: list[str] | None = None,
+    inp_file: str | None = None,
+    by_region: bool = False,
+) -> None:
+    """Main script function.
+
+    Keyword arguments:
+    vtk_directory -- path to vtk directory
+    sta_file -- path to CalculiX sta file
+    output_file -- path to output csv file
+    jobs -- number of worker processes reducing .vtk files
+    cache_file -- (optional) path to per-file statistics cache
+    frd_file -- (optional) path to CalculiX result file read instead of .vtk files
+    stats -- (optional) names of additional statistics, see statistics.STATISTICS
+    inp_file -- (optional) path to CalculiX input file, required by hotspot and by_region
+    by_region -- add per-region statistics of heat flux surfaces in inp_file
+    """
+    requested = tuple(name for name in statistics.STATISTICS if name in (stats or []))
+    if (by_region or "hotspot" in requested) and not inp_file:
+        raise ValueError("Hotspot and per-region statistics require .inp file")
+    region_index = regions.build_index(inp_file) if by_region and inp_file else None
+    if frd_file:
+        results = collect_frd_stats(frd_file, requested, region_index)
+    else:
+        results = collect_vtk_stats(
+            vtk_directory, jobs, cache_file, requested, region_index
+        )
+    region_stats = regions.get_stat_names(region_index) if region_index else []
 
     timesteps = get_timesteps(sta_file)
+    # Simulation still running or interrupted conversion
+    rows = min(len(timesteps), len(results))
+    if len(timesteps) != len(results):
+        log.warning(
+            f"{len(results)} results do not match {len(timesteps)} time steps "
+            f"in {sta_file}, using the first {rows} rows"
+        )
 
-    df = pd.DataFrame(
-        data={
-            "time [s]": timesteps,
-            "max [K]": max_K,
-            "max [C]": max_C,
-            "max [F]": max_F,
-            "min [K]": min_K,
-            "min [C]": min_C,
-            "min [F]": min_F,
-        }
-    )
+    data: dict[str, list] = {"time [s]": timesteps[:rows]}
+    for name in ("max", "min", *requested, *region_stats):
+        values: list = [result[name] for result in results[:rows]]
+        if name == "hotspot" and inp_file:
+            data["hotspot node"] = get_node_numbers(inp_file, values)
+            continue
+        data[f"{name} [K]"] = values
+        data[f"{name} [C]"] = [value - 273.15 for value in values]
+        data[f"{name} [F]"] = [(value - 273.15) * 1.8 + 32 for value in values]
+    df = pd.DataFrame(data=data)
 
     print()
     print(f"Collected {len(df)} rows")
@@ -1,10 +1,15 @@
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
 import matplotlib.pyplot as plt
+from postprocessing.downsample import get_pixel_width, minmax
 import pandas as pd
 import numpy as np
 import typer
 import json
 import os
 
+STYLE = os.path.join(os.path.abspath(os.path.dirname(__file__)), "antmicro.mplstyle")
+
 
 def ensure_output_directory(output_dir: str) -> None:
     """Ensure that the output directory exists."""
@@ -27,6 +32,7 @@ def plot(
     title: str,
     unit: str,
     output_dir: str,
+    downsample: bool = True,
 ) -> None:
     """Generate temperature plot.
 
@@ -36,11 +42,13 @@ def plot(
     title -- chart title
     unit -- unit of temperature
     output_dir -- path to chart directory
+    downsample -- draw only extremes of every pixel column of long series
     """
     ensure_output_directory(output_dir)
-    plt.style.use(
-        os.path.join(os.path.abspath(os.path.dirname(__file__)), "antmicro.mplstyle")
-    )
+    plt.style.use(STYLE)
+    if downsample:
+        buckets = get_pixel_width(plt.gcf())
+        time, temperature = minmax(time, temperature, buckets)
     plt.plot(time, temperature, color="orange")
     plt.grid()
     plt.title(f"Temperature vs {title}")
@@ -58,9 +66,7 @@ def plot_iterations(counts: np.ndarray, bins: np.ndarray, output_dir: str) -> No
     bins -- number of bins
     output_dir -- path to graph storage dir
     """
-    plt.style.use(
-        os.path.join(os.path.abspath(os.path.dirname(__file__)), "antmicro.mplstyle")
-    )
+    plt.style.use(STYLE)
     plt.stairs(counts, bins, color="orange")
     plt.grid()
     plt.title("Itterations over time")
@@ -70,6 +76,81 @@ def plot_iterations(counts: np.ndarray, bins: np.ndarray, output_dir: str) -> No
     plt.close()
 
 
+class PlotRenderer:
+    """Renders temperature plots reusing a single figure.
+
+    Style is loaded once, every plot only updates data and labels of the line.
+    Output is the same as of plot().
+    """
+
+    def __init__(self, downsample: bool = True):
+        plt.style.use(STYLE)
+        self.figure, self.axes = plt.subplots()
+        (self.line,) = self.axes.plot([], [], color="orange")
+        self.axes.grid()
+        self.axes.set_xlabel("Time [s]")
+        self.buckets = get_pixel_width(self.figure) if downsample else 0
+
+    def render(self, temperature, time, title: str, unit: str, output_dir: str) -> None:
+        """Save temperature plot, arguments are the same as of plot()."""
+        if self.buckets:
+            time, temperature = minmax(time, temperature, self.buckets)
+        self.line.set_data(time, temperature)
+        self.axes.relim()
+        self.axes.autoscale_view()
+        self.axes.set_title(f"Temperature vs {title}")
+        self.axes.set_ylabel(f"Temperature [{unit}]")
+        self.figure.savefig(f"{output_dir}/temperature_vs_time_{title}_{unit}.jpg")
+
+    def close(self) -> None:
+        plt.close(self.figure)
+
+
+def render_plots(plots: list[tuple], output_dir: str, downsample: bool = True) -> None:
+    """Render plots with a single figure.
+
+    Keyword arguments:
+    plots -- (temperature, time, title, unit) of every plot
+    output_dir -- path to chart directory
+    downsample -- draw only extremes of every pixel column of long series
+    """
+    renderer = PlotRenderer(downsample)
+    for temperature, time, title, unit in plots:
+        renderer.render(temperature, time, title, unit, output_dir)
+    renderer.close()
+
+
+def use_agg_backend() -> None:
+    # Workers only write files, no display is needed
+    matplotlib.use("Agg")
+
+
+def get_plots(sim_data: pd.DataFrame) -> list[tuple]:
+    """Get (temperature, time, title, unit) of every temperature plot.
+
+    Keyword arguments:
+    sim_data -- simulation results
+    """
+    time = sim_data["time [s]"].to_numpy()
+    simulation_steps = np.arange(0, len(sim_data))
+    plots = []
+    for x, axis, units in (
+        (time, "Time", ("C", "K", "F")),
+        (simulation_steps, "Simulation steps", ("K", "C", "F")),
+    ):
+        for stat in ("maximum", "minimum", "difference"):
+            for unit in units:
+                maximum = sim_data[f"max [{unit}]"].to_numpy()
+                minimum = sim_data[f"min [{unit}]"].to_numpy()
+                temperature = {
+                    "maximum": maximum,
+                    "minimum": minimum,
+                    "difference": maximum - minimum,
+                }[stat]
+                plots.append((temperature, x, f"{axis} ({stat})", unit))
+    return plots
+
+
 def get_time_steps(simulation_json: str) -> float:
     """Get number of simulation time steps from simulation json settings.
 
@@ -84,7 +165,11 @@ def get_time_steps(simulation_json: str) -> float:
 
 
 def main(
-    data_file: str, output_dir: str = "graphs", simulation_json: str | None = None
+    data_file: str,
+    output_dir: str = "graphs",
+    simulation_json: str | None = None,
+    jobs: int = 1,
+    downsample: bool = True,
 ) -> None:
     """Main script method.
 
@@ -92,53 +177,36 @@ def main(
     data_file -- path to simulation output file csv
     output_dir -- path to output directory
     simulation_json -- (optional) path to json file
+    jobs -- number of processes rendering plots (0 uses all CPUs)
+    downsample -- draw only extremes of every pixel column of long series
     """
     if not output_dir:
         output_dir = "graphs"
     ensure_output_directory(output_dir)
     sim_data = read_simulation_data(data_file)
 
-    max_C = sim_data["max [C]"]
-    max_K = sim_data["max [K]"]
-    max_F = sim_data["max [F]"]
-    min_C = sim_data["min [C]"]
-    min_K = sim_data["min [K]"]
-    min_F = sim_data["min [F]"]
-    time = sim_data["time [s]"]
-
-    # Plot max and min values over time
-    plot(max_C, time, "Time (maximum)", "C", output_dir)
-    plot(max_K, time, "Time (maximum)", "K", output_dir)
-    plot(max_F, time, "Time (maximum)", "F", output_dir)
-    plot(min_C, time, "Time (minimum)", "C", output_dir)
-    plot(min_K, time, "Time (minimum)", "K", output_dir)
-    plot(min_F, time, "Time (minimum)", "F", output_dir)
-
-    # Compute and plot differences
-    diff_C = max_C - min_C
-    diff_K = max_K - min_K
-    diff_F = max_F - min_F
-    plot(diff_C, time, "Time (difference)", "C", output_dir)
-    plot(diff_K, time, "Time (difference)", "K", output_dir)
-    plot(diff_F, time, "Time (difference)", "F", output_dir)
-
-    # Plot values over simulation steps
-    simulation_steps = np.arange(0, len(max_K))
-
-    plot(max_K, simulation_steps, "Simulation steps (maximum)", "K", output_dir)
-    plot(max_C, simulation_steps, "Simulation steps (maximum)", "C", output_dir)
-    plot(max_F, simulation_steps, "Simulation steps (maximum)", "F", output_dir)
-
-    plot(min_K, simulation_steps, "Simulation steps (minimum)", "K", output_dir)
-    plot(min_C, simulation_steps, "Simulation steps (minimum)", "C", output_dir)
-    plot(min_F, simulation_steps, "Simulation steps (minimum)", "F", output_dir)
-
-    plot(diff_K, simulation_steps, "Simulation steps (difference)", "K", output_dir)
-    plot(diff_C, simulation_steps, "Simulation steps (difference)", "C", output_dir)
-    plot(diff_F, simulation_steps, "Simulation steps (difference)", "F", output_dir)
+    plots = get_plots(sim_data)
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        render_plots(plots, output_dir, downsample)
+    else:
+        # Every process renders its share of plots with its own figure
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=use_agg_backend
+        ) as executor:
+            list(
+                executor.map(
+                    render_plots,
+                    [plots[n::jobs] for n in range(jobs)],
+                    [output_dir] * jobs,
+                    [downsample] * jobs,
+                )
+            )
 
     if simulation_json is not None:
-        counts, bins = np.histogram(time, bins=int(get_time_steps(simulation_json)))
+        counts, bins = np.histogram(
+            sim_data["time [s]"], bins=int(get_time_steps(simulation_json))
+        )
         plot_iterations(counts, bins, output_dir)
 
 
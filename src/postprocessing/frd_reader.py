@@ -0,0 +1,107 @@
+from typing import Iterator
+import numpy as np
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class FrdParser:
+    """Streaming parser of CalculiX ASCII result file (.frd).
+
+    Lines are fed one by one, complete nodal result blocks of the requested
+    dataset are returned as (time, values) where values are ordered
+    by ascending node number, the same way ccx2paraview orders .vtk points.
+    """
+
+    def __init__(self, dataset: str = "NDTEMP"):
+        """Create parser.
+
+        Keyword arguments:
+        dataset -- name of the nodal result dataset, NDTEMP holds temperatures
+        """
+        self.dataset = dataset
+        self.nodes: np.ndarray | None = None  # sorted node numbers
+        self.state = ""
+        self.time = 0.0
+        self.lines: list[str] = []
+
+    def feed(self, line: str) -> tuple[float, np.ndarray] | None:
+        """Parse a single line.
+
+        Returns (time, values) when a result block of the dataset ends.
+
+        Keyword arguments:
+        line -- line of the .frd file
+        """
+        record = line[:3]
+        if record == " -1":
+            if self.state in ("nodes", "results"):
+                self.lines.append(line.rstrip("\r\n"))
+            return None
+        if record == " -3":
+            return self.end_block()
+        if record == " -4":
+            if self.state == "header":
+                name = line[3:].split()[0]
+                self.state = "results" if name == self.dataset else ""
+            return None
+        if record in (" -2", " -5"):
+            return None
+
+        key = line[:5].strip()
+        if key == "2":
+            if line.rstrip().endswith(" 2"):
+                raise ValueError("Binary .frd files are not supported")
+            self.state = "nodes"
+            self.lines = []
+        elif key == "100":
+            self.time = float(line[12:24])
+            self.state = "header"
+            self.lines = []
+        else:
+            self.state = ""
+        return None
+
+    def end_block(self) -> tuple[float, np.ndarray] | None:
+        """Finish current block."""
+        state = self.state
+        lines = self.lines
+        self.state = ""
+        self.lines = []
+        if state == "nodes":
+            # " -1" + node number + 3 coordinates written as E12.5
+            numbers = np.array([line[3:-36] for line in lines], dtype=np.int64)
+            self.nodes = np.sort(numbers)
+            log.debug(f"{len(numbers)} nodes")
+        elif state == "results":
+            if self.nodes is None:
+                raise ValueError("Nodal results found before node block")
+            # " -1" + node number + value written as E12.5
+            numbers = np.array([line[3:-12] for line in lines], dtype=np.int64)
+            values = np.array([line[-12:] for line in lines], dtype=np.float64)
+            # Nodes missing in result block and non-finite values are zeroed
+            # the same way ccx2paraview does
+            array = np.zeros(len(self.nodes), dtype=np.float64)
+            array[np.searchsorted(self.nodes, numbers)] = values
+            array[~np.isfinite(array)] = 0.0
+            return self.time, array
+        return None
+
+
+def read_frd(
+    filename: str, dataset: str = "NDTEMP"
+) -> Iterator[tuple[float, np.ndarray]]:
+    """Read nodal results in a single pass over .frd file.
+
+    Yields (time, values) for every step of the dataset.
+
+    Keyword arguments:
+    filename -- path to .frd file
+    dataset -- name of the nodal result dataset
+    """
+    parser = FrdParser(dataset)
+    with open(filename, "r") as f:
+        for line in f:
+            step = parser.feed(line)
+            if step is not None:
+                yield step
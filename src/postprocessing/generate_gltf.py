@@ -41,16 +41,16 @@ def generate(
     ensure_output_directory(output_dir)
     files = get_vtk_files()
     print("Generating GLTF files...")
-    for idx, file in enumerate(files):
-        vtk_reader = pvs.OpenDataFile(file)
-        render_view = pvs.GetActiveViewOrCreate("RenderView")
-        display = temperature_displayer(vtk_reader, render_view, 273.15, 433.15)
-        pvs.UpdatePipeline()
+    vtk_reader = pvs.LegacyVTKReader(registrationName="Simulation", FileNames=files)
+    render_view = pvs.GetActiveViewOrCreate("RenderView")
+    temperature_displayer(vtk_reader, render_view, 273.15, 433.15)
+    animation = pvs.GetAnimationScene()
+    animation.UpdateAnimationUsingDataTimeSteps()
+    for idx in range(len(files)):
+        animation.AnimationTime = idx
         pvs.Render()
         filename = f"{output_dir}/{idx:04d}.gltf"
         pvs.ExportView(filename, view=render_view)
-        pvs.Delete(vtk_reader)
-        pvs.Delete(display)
     print("Finished")
 
 
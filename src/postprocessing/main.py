@@ -1,9 +1,6 @@
-from postprocessing import create_csv
-from postprocessing import create_plot
-from postprocessing import plot_comparison
 from pathlib import Path
 import typer
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 import subprocess
 import logging
@@ -15,6 +12,15 @@ logging.basicConfig(
 )
 
 
+class Statistic(str, Enum):
+    mean = "mean"
+    wmean = "wmean"
+    p50 = "p50"
+    p95 = "p95"
+    p99 = "p99"
+    hotspot = "hotspot"
+
+
 @app.command()
 def csv(
     vtk: str = typer.Option("vtk", help="Path to directory with .vtk files"),
@@ -22,9 +28,120 @@ def csv(
         "FEMMeshGmsh.sta", help="Path to CalculiX time stamp file (.sta)"
     ),
     output: str = typer.Option("temperature.csv", help="Path to output file"),
+    jobs: int = typer.Option(
+        1, min=0, help="Number of processes reducing .vtk files (0 uses all CPUs)"
+    ),
+    cache: Optional[str] = typer.Option(
+        None, help="Path to per-file statistics cache (.json) for incremental runs"
+    ),
+    frd: Optional[str] = typer.Option(
+        None, help="Path to CalculiX result file (.frd) read instead of .vtk files"
+    ),
+    stat: Optional[List[Statistic]] = typer.Option(
+        None, help="Additional statistic column (can be repeated)"
+    ),
+    by_region: bool = typer.Option(
+        False, help="Add max/min/mean of every heat flux surface from .inp file"
+    ),
+    inp: str = typer.Option(
+        "FEMMeshGmsh.inp",
+        help="Path to CalculiX input file (.inp) for --by-region and hotspot",
+    ),
 ):
     """Generate csv file from simulation output"""
-    create_csv.main(vtk, sta, output)
+    from postprocessing import create_csv
+
+    stats = [statistic.value for statistic in stat] if stat else None
+    create_csv.main(vtk, sta, output, jobs, cache, frd, stats, inp, by_region)
+
+
+@app.command()
+def archive(
+    vtk: str = typer.Option("vtk", help="Path to directory with .vtk files"),
+    sta: str = typer.Option(
+        "FEMMeshGmsh.sta", help="Path to CalculiX time stamp file (.sta)"
+    ),
+    output: str = typer.Option("archive", help="Path to archive directory"),
+):
+    """Store mesh and all time steps in a memory-mappable archive"""
+    from postprocessing import archive as result_archive
+
+    result_archive.build(vtk, sta, output)
+
+
+@app.command()
+def monitor(
+    sta: str = typer.Option(
+        "FEMMeshGmsh.sta", help="Path to CalculiX time stamp file (.sta)"
+    ),
+    sim: str = typer.Option("simulation.json", help="Path to simulation settings file"),
+    frd: Optional[str] = typer.Option(
+        None, help="Path to CalculiX result file (.frd) to report temperature"
+    ),
+    interval: float = typer.Option(5.0, help="Time between reports [s]"),
+    once: bool = typer.Option(False, help="Report current progress and exit"),
+    timeout: Optional[float] = typer.Option(
+        None, help="Stop after given time without progress [s]"
+    ),
+):
+    """Report progress and ETA of a running simulation"""
+    from postprocessing import monitor as progress_monitor
+
+    progress_monitor.main(sta, sim, frd, interval, once, timeout)
+
+
+@app.command()
+def benchmark(
+    nodes: List[int] = typer.Option([10000], help="Number of nodes (can be repeated)"),
+    steps: List[int] = typer.Option(
+        [10], help="Number of time steps (can be repeated)"
+    ),
+    output: str = typer.Option("benchmark.json", help="Path to output file (.json)"),
+    jobs: int = typer.Option(
+        1, min=0, help="Number of processes used by tpost csv (0 uses all CPUs)"
+    ),
+    repeat: int = typer.Option(
+        1, min=1, help="Runs of every stage, the fastest is reported"
+    ),
+    workdir: Optional[str] = typer.Option(
+        None, help="Directory to keep generated data (temporary by default)"
+    ),
+):
+    """Benchmark postprocessing on synthetic simulation data"""
+    from postprocessing import benchmark as postprocessing_benchmark
+
+    postprocessing_benchmark.main(nodes, steps, output, jobs, repeat, workdir)
+
+
+@app.command()
+def benchmark_plot(
+    rows: int = typer.Option(10000, help="Number of csv rows"),
+    jobs: List[int] = typer.Option([1], help="Renderer processes (can be repeated)"),
+    output: str = typer.Option(
+        "plot_benchmark.json", help="Path to output file (.json)"
+    ),
+    repeat: int = typer.Option(
+        1, min=1, help="Runs of every variant, the fastest is reported"
+    ),
+):
+    """Benchmark rendering of tpost plot graphs on synthetic csv"""
+    from postprocessing import benchmark as postprocessing_benchmark
+
+    postprocessing_benchmark.main_plot(rows, jobs, output, repeat)
+
+
+@app.command()
+def benchmark_startup(
+    output: str = typer.Option("startup.json", help="Path to output file (.json)"),
+    repeat: int = typer.Option(
+        5, help="Runs of every command, the fastest is reported"
+    ),
+):
+    """Measure startup time of tpost and tpre commands against their budget"""
+    from postprocessing import benchmark as postprocessing_benchmark
+
+    if not postprocessing_benchmark.main_startup(output, repeat):
+        raise typer.Exit(code=1)
 
 
 @app.command()
@@ -34,9 +151,17 @@ def plot(
     ),
     output: str = typer.Option("graphs", help="Path to graph directory"),
     sim: Optional[str] = typer.Option(None, help="Path to simulation settings file"),
+    jobs: int = typer.Option(
+        1, min=0, help="Number of processes rendering graphs (0 uses all CPUs)"
+    ),
+    downsample: bool = typer.Option(
+        True, help="Draw only extremes of every pixel column of long series"
+    ),
 ):
     """Generate temperature characteristics"""
-    create_plot.main(csv, output, sim)
+    from postprocessing import create_plot
+
+    create_plot.main(csv, output, sim, jobs, downsample)
 
 
 class Position(str, Enum):
@@ -55,16 +180,55 @@ def compare_csv(
     csv2: str = typer.Option("", help="Path to 2nd csv"),
     label1: str = typer.Option("Simulation", help="Name of 1st plot"),
     label2: str = typer.Option("Measurements", help="Name of 2nd plot"),
+    csv: List[str] = typer.Option(
+        [], help="Path to next csv, after --csv1 and --csv2 (can be repeated)"
+    ),
+    label: List[str] = typer.Option(
+        [], help="Name of next csv plot, file name by default (can be repeated)"
+    ),
+    reference: int = typer.Option(
+        0, help="Index of the csv other ones are compared with (0 is the 1st)"
+    ),
     kelvin: Optional[bool] = typer.Option(False, help="Use Kelvin temperature scale"),
     fahrenheit: Optional[bool] = typer.Option(
         False, help="Use Fahrenheit temperature scale"
     ),
     name: Optional[str] = typer.Option(None, help="Graph name"),
+    downsample: bool = typer.Option(
+        True, help="Draw only extremes of every pixel column of long series"
+    ),
+    output: Optional[str] = typer.Option(
+        None, help="Path to saved graph, the graph is shown by default"
+    ),
+    metrics: Optional[str] = typer.Option(
+        None, help="Path to metrics table (.csv) of comparison with the reference"
+    ),
 ):
-    """Compare two temperature plots on a common graph"""
-    plot_comparison.plot(
-        legend, time, csv1, csv2, label1, label2, kelvin, fahrenheit, name
-    )
+    """Compare temperature plots on a common graph"""
+    from postprocessing import plot_comparison
+
+    csvs = [path for path in (csv1, csv2) if path]
+    labels = [name for path, name in ((csv1, label1), (csv2, label2)) if path]
+    if len(label) > len(csv):
+        raise typer.BadParameter("More --label than --csv options")
+    csvs += csv
+    labels += label + [Path(path).stem for path in csv[len(label) :]]
+    unit = "K" if kelvin else "F" if fahrenheit else "C"
+    try:
+        plot_comparison.main(
+            csvs,
+            labels,
+            unit,
+            legend.value if legend else None,
+            time,
+            name,
+            output,
+            metrics,
+            reference,
+            downsample,
+        )
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
 
 
 @app.command()
@@ -130,11 +294,101 @@ def preview():
     subprocess.run(["pvpython", str(path / "create_previews.py")])
 
 
+class AnimationFormat(str, Enum):
+    png = "png"
+    mp4 = "mp4"
+    webm = "webm"
+
+
+# Views rendered by create_animation.py
+ANIMATION_VIEWS = ("ISO", "TOP", "BOTTOM")
+
+
+def join_segments(video_format: str, workers: int) -> None:
+    """Join video segments of animation workers into one video per view.
+
+    Keyword arguments:
+    video_format -- extension of the videos
+    workers -- number of workers, each wrote one segment of every view
+    """
+    # Named like get_video_name in create_animation.py
+    segments = {
+        view: [
+            Path("animations") / f"{view}_{worker:03d}.{video_format}"
+            for worker in range(workers)
+        ]
+        for view in ANIMATION_VIEWS
+    }
+    for view, files in segments.items():
+        playlist = Path("animations") / f"{view}_segments.txt"
+        playlist.write_text("".join(f"file '{file.name}'\n" for file in files))
+        # Segments share the encoder settings, so they are joined without re-encoding
+        subprocess.run(
+            [
+                "ffmpeg",
+                "-y",
+                "-loglevel",
+                "error",
+                "-f",
+                "concat",
+                "-safe",
+                "0",
+                "-i",
+                str(playlist),
+                "-c",
+                "copy",
+                f"animations/{view}.{video_format}",
+            ],
+            check=True,
+        )
+        playlist.unlink()
+        for file in files:
+            file.unlink()
+
+
 @app.command()
-def animation():
+def animation(
+    workers: int = typer.Option(
+        1, min=1, help="Number of pvpython processes splitting the frames"
+    ),
+    video_format: AnimationFormat = typer.Option(
+        AnimationFormat.png,
+        "--format",
+        help="PNG frames or video encoded by ffmpeg while rendering",
+    ),
+    fps: int = typer.Option(5, min=1, help="Frames per second of videos"),
+):
     """Create paraview animation."""
+    # Every .vtk file is one frame, workers without frames would write empty videos
+    frames = len(list(Path("vtk").glob("*.vtk")))
+    workers = max(1, min(workers, frames))
     path = Path(__file__).parent
-    subprocess.run(["pvpython", str(path / "create_animation.py")])
+    script = str(path / "create_animation.py")
+    processes = [
+        subprocess.Popen(
+            [
+                "pvpython",
+                script,
+                "--worker",
+                str(worker),
+                "--workers",
+                str(workers),
+                "--format",
+                video_format.value,
+                "--fps",
+                str(fps),
+                "--views",
+                *ANIMATION_VIEWS,
+            ]
+        )
+        for worker in range(workers)
+    ]
+    failed = sum(process.wait() != 0 for process in processes)
+    if failed:
+        logging.error(f"{failed} of {workers} animation workers failed")
+        raise typer.Exit(code=1)
+    if video_format != AnimationFormat.png and workers > 1:
+        join_segments(video_format.value, workers)
 
 
 def main():
@@ -0,0 +1,174 @@
+from postprocessing.sta import HEADER_LINES, parse_sta_line
+from postprocessing.frd_reader import FrdParser
+import json
+import logging
+import os
+import time
+
+log = logging.getLogger(__name__)
+
+
+class FileFollower:
+    """Read lines appended to a file that is still being written."""
+
+    def __init__(self, filename: str, skip_lines: int = 0):
+        """Create follower.
+
+        Keyword arguments:
+        filename -- path to followed file
+        skip_lines -- number of header lines to skip
+        """
+        self.filename = filename
+        self.header_lines = skip_lines
+        self.skip_lines = skip_lines
+        self.offset = 0
+        self.partial = ""
+        # Set when the file was truncated, cleared by the reader
+        self.restarted = False
+
+    def read_lines(self) -> list[str]:
+        """Return complete lines appended since the last call."""
+        try:
+            size = os.path.getsize(self.filename)
+        except OSError:
+            return []
+        if size < self.offset:
+            # File was truncated by a new solver run - start over
+            self.offset = 0
+            self.partial = ""
+            self.skip_lines = self.header_lines
+            self.restarted = True
+        if size == self.offset:
+            return []
+        with open(self.filename, "rb") as f:
+            f.seek(self.offset)
+            text = self.partial + f.read(size - self.offset).decode(errors="replace")
+        self.offset = size
+        lines = text.splitlines(keepends=True)
+        self.partial = ""
+        if lines and not lines[-1].endswith("\n"):
+            self.partial = lines.pop()
+        if self.skip_lines:
+            skipped = min(self.skip_lines, len(lines))
+            self.skip_lines -= skipped
+            del lines[:skipped]
+        return lines
+
+
+def get_time_end(simulation_json: str) -> float | None:
+    """Get simulation end time from simulation json settings.
+
+    Keyword arguments:
+    simulation_json -- path to simulation json file
+    """
+    try:
+        with open(simulation_json, "r") as file:
+            data = json.load(file)
+    except OSError:
+        log.warning(f"{simulation_json} not found, ETA is not available")
+        return None
+    return float(data["Solver Configuration"]["Time End"])
+
+
+def main(
+    sta_file: str,
+    simulation_json: str,
+    frd_file: str | None = None,
+    interval: float = 5.0,
+    once: bool = False,
+    timeout: float | None = None,
+) -> None:
+    """Report progress of a running CalculiX simulation.
+
+    Every report is logged and printed as a "PROGRESS {json}" line.
+    Monitoring ends when simulated time reaches the end time or when
+    .sta file did not change for timeout seconds.
+
+    Keyword arguments:
+    sta_file -- path to CalculiX sta file
+    simulation_json -- path to simulation json file
+    frd_file -- (optional) path to CalculiX result file to report temperature
+    interval -- time between reports [s]
+    once -- report current state and exit
+    timeout -- (optional) stop after given time without progress [s]
+    """
+    time_end = get_time_end(simulation_json)
+    sta = FileFollower(sta_file, skip_lines=HEADER_LINES)
+    frd = FileFollower(frd_file) if frd_file else None
+    parser = FrdParser()
+    sim_time = 0.0
+    increments = 0
+    t_max = None
+    start = None
+    last_change = time.monotonic()
+    while True:
+        new_increments = 0
+        lines = sta.read_lines()
+        if sta.restarted:
+            # New solver run, progress of the previous one is dropped
+            sta.restarted = False
+            sim_time = 0.0
+            increments = 0
+            start = None
+            log.info(f"{sta_file} was truncated, monitoring a new run")
+        for line in lines:
+            step = parse_sta_line(line)
+            if step is not None:
+                sim_time = float(step)
+                new_increments += 1
+        increments += new_increments
+        if frd is not None:
+            lines = frd.read_lines()
+            if frd.restarted:
+                frd.restarted = False
+                parser = FrdParser()
+                t_max = None
+            for line in lines:
+                result = parser.feed(line)
+                if result is not None:
+                    t_max = float(result[1].max())
+
+        now = time.monotonic()
+        if new_increments:
+            last_change = now
+        # Rates are measured from the first report, earlier increments
+        # were computed before monitoring started
+        if start is None:
+            start = (now, sim_time, increments)
+        elapsed = now - start[0]
+        rate = (increments - start[2]) / elapsed if elapsed > 0 else None
+        sim_rate = (sim_time - start[1]) / elapsed if elapsed > 0 else None
+        eta = None
+        if time_end is not None and sim_rate:
+            eta = max(time_end - sim_time, 0.0) / sim_rate
+        finished = time_end is not None and sim_time >= time_end
+
+        progress = {
+            "time": sim_time,
+            "time_end": time_end,
+            "fraction": sim_time / time_end if time_end else None,
+            "increments": increments,
+            "increments_per_second": rate,
+            "eta": eta,
+            "max_temperature": t_max,
+            "finished": finished,
+        }
+        message = f"Time {sim_time:g}"
+        if time_end:
+            message += f"/{time_end:g} s ({100 * sim_time / time_end:.1f}%)"
+        message += f", {increments} increments"
+        if rate is not None:
+            message += f", {rate:.2f} increments/s"
+        if eta is not None:
+            message += f", ETA {eta:.0f} s"
+        if t_max is not None:
+            message += f", max {t_max - 273.15:.2f} °C"
+        log.info(message)
+        print(f"PROGRESS {json.dumps(progress)}", flush=True)
+
+        if once or finished:
+            break
+        if timeout is not None and now - last_change > timeout:
+            log.warning(f"No progress in {sta_file} for {timeout:g} s")
+            break
+        time.sleep(interval)
@@ -1,40 +1,194 @@
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
+import logging
 from pathlib import Path
+from postprocessing.downsample import get_pixel_width, minmax
 
+log = logging.getLogger(__name__)
 
-def plot(legend, user_time, csv1, csv2, label1, label2, kelvin, fahrenheit, name):
-    csv1_path = Path(csv1).resolve()
-    csv2_path = Path(csv2).resolve()
-    data1 = pd.read_csv(csv1_path)
-    data2 = pd.read_csv(csv2_path)
-    time1 = data1["time [s]"]
-    time2 = data2["time [s]"]
+# Line style of every compared series, the first two as in the 2-way comparison
+LINE_STYLES = [
+    ("--", "white"),
+    ("-", "orange"),
+    ("-", "#00af91"),
+    ("-", "#c0e4eb"),
+    ("-", "#e74a3c"),
+    ("-", "#c4c2c5"),
+]
 
-    plt.style.use(Path(__file__).parent.resolve() / "antmicro.mplstyle")
 
-    if kelvin:
-        temperature1 = [T for T in data1["max [K]"]]
-        temperature2 = [T for T in data2["max [K]"]]
-        plt.ylabel("Temperature [K]")
-    elif fahrenheit:
-        temperature1 = [T for T in data1["max [F]"]]
-        temperature2 = [T for T in data2["max [F]"]]
-        plt.ylabel("Temperature [°F]")
-    else:
-        temperature1 = [T for T in data1["max [C]"]]
-        temperature2 = [T for T in data2["max [C]"]]
-        plt.ylabel("Temperature [°C]")
-
-    plt.plot(time1, temperature1, "--", color="white", label=label1)
-    plt.plot(time2, temperature2, color="orange", label=label2)
-    if legend is None:
-        legend = "best"
-    plt.legend(loc=legend)
+def get_buckets(time: np.ndarray, width: int, user_time: float | None) -> int:
+    """Get number of downsampling buckets keeping a point pair per visible pixel.
+
+    Keyword arguments:
+    time -- time series
+    width -- pixel width of the figure
+    user_time -- (optional) max visible time [s]
+    """
+    span = time[-1] - time[0]
+    # Visible range starts at -30 s
+    if user_time and 0 < user_time + 30 < span:
+        return int(width * span / (user_time + 30))
+    return width
+
+
+def read_series(csv: str, unit: str) -> tuple[np.ndarray, np.ndarray]:
+    """Read time [s] and maximum temperature of tpost csv output sorted by time.
+
+    Keyword arguments:
+    csv -- path to csv file
+    unit -- temperature unit, K, C or F
+    """
+    data = pd.read_csv(Path(csv).resolve()).sort_values("time [s]", kind="stable")
+    if data["time [s]"].duplicated().any():
+        raise ValueError(f"{csv} has duplicated time points")
+    return data["time [s]"].to_numpy(), data[f"max [{unit}]"].to_numpy()
+
+
+def get_common_grid(times: list[np.ndarray]) -> np.ndarray:
+    """Get time points of all series within the time range covered by every series.
+
+    Keyword arguments:
+    times -- time series
+    """
+    start = max(time[0] for time in times)
+    end = min(time[-1] for time in times)
+    if start > end:
+        raise ValueError("Compared series do not overlap in time")
+    grid = np.unique(np.concatenate(times))
+    return grid[(grid >= start) & (grid <= end)]
+
+
+def compute_metrics(
+    series: list[tuple[np.ndarray, np.ndarray]], labels: list[str], reference: int
+) -> pd.DataFrame:
+    """Compare every series with the reference on a common time grid.
+
+    Series are linearly interpolated on time points of all series within
+    their common time range. Peaks are taken from the original points
+    within the common range.
+
+    Keyword arguments:
+    series -- time [s] and temperature of every series
+    labels -- name of every series
+    reference -- index of the reference series
+    """
+    grid = get_common_grid([time for time, _ in series])
+    values = np.vstack([np.interp(grid, time, temp) for time, temp in series])
+    errors = values - values[reference]
+    peak_values = []
+    peak_times = []
+    for time, temp in series:
+        common = (time >= grid[0]) & (time <= grid[-1])
+        peak = np.argmax(temp[common])
+        peak_values.append(temp[common][peak])
+        peak_times.append(time[common][peak])
+    peaks = np.array(peak_times)
+    metrics = pd.DataFrame(
+        {
+            "series": labels,
+            "rmse": np.sqrt(np.mean(errors**2, axis=1)),
+            "max abs error": np.max(np.abs(errors), axis=1),
+            "peak": peak_values,
+            "time to peak [s]": peaks,
+            "time to peak error [s]": peaks - peaks[reference],
+        }
+    )
+    return metrics.drop(index=reference).reset_index(drop=True)
+
+
+def main(
+    csvs: list[str],
+    labels: list[str],
+    unit: str = "C",
+    legend: str | None = None,
+    user_time: float | None = None,
+    name: str | None = None,
+    output: str | None = None,
+    metrics_file: str | None = None,
+    reference: int = 0,
+    downsample: bool = True,
+) -> pd.DataFrame | None:
+    """Plot maximum temperature of csv files on a common graph and compare them.
+
+    Returns comparison metrics against the reference (None for a single csv).
+
+    Keyword arguments:
+    csvs -- paths to tpost csv output or measurements in the same format
+    labels -- name of every csv
+    unit -- temperature unit, K, C or F
+    legend -- (optional) legend location
+    user_time -- (optional) max time [s]
+    name -- (optional) graph name
+    output -- (optional) path to saved graph, the graph is shown by default
+    metrics_file -- (optional) path to metrics table (.csv)
+    reference -- index of the csv other ones are compared with
+    downsample -- draw only extremes of every pixel column of long series
+    """
+    if len(labels) != len(csvs):
+        raise ValueError(f"{len(labels)} labels given for {len(csvs)} csv files")
+    if not csvs:
+        raise ValueError("No csv files to compare")
+    if not 0 <= reference < len(csvs):
+        raise ValueError(f"Reference {reference} is not an index of {len(csvs)} csvs")
+    if metrics_file and len(csvs) < 2:
+        raise ValueError("Metrics need at least two csv files")
+    series = [read_series(csv, unit) for csv in csvs]
+    metrics = None
+    if len(series) > 1:
+        metrics = compute_metrics(series, labels, reference)
+        log.info(f"Compared with {labels[reference]}:\n{metrics.to_string()}")
+        if metrics_file:
+            metrics.to_csv(metrics_file, index=False)
+
+    if output:
+        # Saved without a display
+        plt.switch_backend("Agg")
+    plt.style.use(Path(__file__).parent.resolve() / "antmicro.mplstyle")
+    symbol = "K" if unit == "K" else f"°{unit}"
+    plt.ylabel(f"Temperature [{symbol}]")
+    width = get_pixel_width(plt.gcf())
+    for idx, ((time, temp), label) in enumerate(zip(series, labels)):
+        if downsample:
+            # Points are limited by the pixel width of the figure
+            time, temp = minmax(time, temp, get_buckets(time, width, user_time))
+        linestyle, color = LINE_STYLES[idx % len(LINE_STYLES)]
+        plt.plot(time, temp, linestyle, color=color, label=label)
+    plt.legend(loc=legend or "best")
     if user_time:
         plt.xlim(-30, user_time)
     if name:
         plt.title(name)
     plt.xlabel("Time [s]")
     plt.grid()
-    plt.show()
+    if output:
+        plt.savefig(output)
+        plt.close()
+    else:
+        plt.show()
+    return metrics
+
+
+def plot(
+    legend,
+    user_time,
+    csv1,
+    csv2,
+    label1,
+    label2,
+    kelvin,
+    fahrenheit,
+    name,
+    downsample=True,
+):
+    unit = "K" if kelvin else "F" if fahrenheit else "C"
+    main(
+        [csv1, csv2],
+        [label1, label2],
+        unit,
+        legend,
+        user_time,
+        name,
+        downsample=downsample,
+    )
@@ -0,0 +1,240 @@
+"""
+Temperature statistics of heat flux surfaces defined in CalculiX input file.
+
+Every *FILM, *RADIATE and *DFLUX block written by FreeCAD is preceded by
+a "** <constraint label>" comment, faces listed in the block are mapped to
+the nodes of the surface. Nodes are indexed in ascending node number order,
+the same way ccx2paraview orders .vtk points and FrdParser orders results.
+"""
+
+from typing import Iterator, NamedTuple
+import numpy as np
+import logging
+import os
+import re
+
+log = logging.getLogger(__name__)
+
+HEAT_FLUX_KEYWORDS = ("*FILM", "*RADIATE", "*DFLUX")
+REGION_STATISTICS = ("max", "min", "mean")
+
+# Local node numbers (1-based) of element faces in CalculiX face order
+FACE_NODES = {
+    "C3D4": ((1, 2, 3), (1, 4, 2), (2, 4, 3), (3, 4, 1)),
+    "C3D10": (
+        (1, 2, 3, 5, 6, 7),
+        (1, 4, 2, 8, 9, 5),
+        (2, 4, 3, 9, 10, 6),
+        (3, 4, 1, 10, 8, 7),
+    ),
+    "C3D6": ((1, 2, 3), (4, 5, 6), (1, 2, 5, 4), (2, 3, 6, 5), (3, 1, 4, 6)),
+    "C3D15": (
+        (1, 2, 3, 7, 8, 9),
+        (4, 5, 6, 10, 11, 12),
+        (1, 2, 5, 4, 7, 14, 10, 13),
+        (2, 3, 6, 5, 8, 15, 11, 14),
+        (3, 1, 4, 6, 9, 13, 12, 15),
+    ),
+    "C3D8": (
+        (1, 2, 3, 4),
+        (5, 8, 7, 6),
+        (1, 5, 6, 2),
+        (2, 6, 7, 3),
+        (3, 7, 8, 4),
+        (4, 8, 5, 1),
+    ),
+    "C3D20": (
+        (1, 2, 3, 4, 9, 10, 11, 12),
+        (5, 8, 7, 6, 16, 15, 14, 13),
+        (1, 5, 6, 2, 17, 13, 18, 9),
+        (2, 6, 7, 3, 18, 14, 19, 10),
+        (3, 7, 8, 4, 19, 15, 20, 11),
+        (4, 8, 5, 1, 20, 16, 17, 12),
+    ),
+}
+
+
+class RegionIndex(NamedTuple):
+    names: tuple[str, ...]
+    indices: np.ndarray  # point indices of all regions, concatenated
+    offsets: np.ndarray  # start of every region in indices
+    counts: np.ndarray  # number of points of every region
+    points: int  # number of points of the mesh
+
+
+def get_parameter(line: str, name: str) -> str | None:
+    """Get value of keyword line parameter, e.g. TYPE of *ELEMENT.
+
+    Keyword arguments:
+    line -- keyword line of .inp file
+    name -- parameter name
+    """
+    for parameter in line.split(",")[1:]:
+        key, _, value = parameter.partition("=")
+        if key.strip().upper() == name:
+            return value.strip()
+    return None
+
+
+def read_inp_lines(filename: str) -> Iterator[str]:
+    """Read lines of .inp file with *INCLUDE files inserted.
+
+    Keyword arguments:
+    filename -- path to .inp file
+    """
+    directory = os.path.dirname(filename)
+    with open(filename, "r") as f:
+        for line in f:
+            if line[:8].upper() == "*INCLUDE":
+                include = get_parameter(line, "INPUT")
+                if include is None:
+                    raise ValueError(f"*INCLUDE without INPUT in {filename}")
+                yield from read_inp_lines(os.path.join(directory, include))
+            else:
+                yield line
+
+
+def read_node_numbers(filename: str) -> np.ndarray:
+    """Read sorted node numbers from .inp file.
+
+    Keyword arguments:
+    filename -- path to .inp file
+    """
+    nodes = []
+    keyword = ""
+    for line in read_inp_lines(filename):
+        if line.startswith("**"):
+            continue
+        if line.startswith("*"):
+            keyword = line.split(",")[0].strip().upper()
+        elif keyword == "*NODE" and line.strip():
+            nodes.append(int(line.split(",", 1)[0]))
+    return np.sort(np.array(nodes, dtype=np.int64))
+
+
+def parse_inp(
+    filename: str,
+) -> tuple[np.ndarray, dict[int, tuple[str, list[int]]], dict[str, list]]:
+    """Parse nodes, elements and heat flux faces from .inp file.
+
+    Returns sorted node numbers, elements as {number: (type, nodes)}
+    and faces as {constraint label: [(element, face)]}.
+
+    Keyword arguments:
+    filename -- path to .inp file
+    """
+    nodes = []
+    elements = {}
+    surfaces: dict[str, list] = {}
+    keyword = ""
+    label = ""
+    element_type = ""
+    element: list[int] = []
+    faces: list = []
+    for line in read_inp_lines(filename):
+        if line.startswith("**"):
+            label = line[2:].strip()
+            continue
+        if line.startswith("*"):
+            keyword = line.split(",")[0].strip().upper()
+            if keyword == "*ELEMENT":
+                element_type = (get_parameter(line, "TYPE") or "").upper()
+            elif keyword in HEAT_FLUX_KEYWORDS:
+                faces = surfaces.setdefault(label, [])
+            continue
+        if not line.strip():
+            continue
+        if keyword == "*NODE":
+            nodes.append(int(line.split(",", 1)[0]))
+        elif keyword == "*ELEMENT":
+            # Long elements continue on the next line after a trailing comma
+            element.extend(int(value) for value in line.split(",") if value.strip())
+            if not line.rstrip().endswith(","):
+                elements[element[0]] = (element_type, element[1:])
+                element = []
+        elif keyword in HEAT_FLUX_KEYWORDS:
+            number, face = line.split(",")[:2]
+            face_id = re.search(r"\d+", face)
+            if face_id is None:
+                raise ValueError(f"Unsupported face {face.strip()} in {filename}")
+            faces.append((int(number), int(face_id.group())))
+    return np.sort(np.array(nodes, dtype=np.int64)), elements, surfaces
+
+
+def get_face_nodes(element_type: str, element_nodes: list[int], face: int) -> list:
+    """Get node numbers of element face.
+
+    Keyword arguments:
+    element_type -- CalculiX element type, e.g. C3D10
+    element_nodes -- node numbers of the element
+    face -- CalculiX face number (1-based)
+    """
+    if element_type not in FACE_NODES:
+        raise ValueError(f"Faces of {element_type} elements are not supported")
+    return [element_nodes[local - 1] for local in FACE_NODES[element_type][face - 1]]
+
+
+def build_index(inp_file: str) -> RegionIndex:
+    """Build index of point indices of every heat flux surface.
+
+    Keyword arguments:
+    inp_file -- path to CalculiX input file (.inp)
+    """
+    nodes, elements, surfaces = parse_inp(inp_file)
+    names = []
+    regions = []
+    for name, faces in surfaces.items():
+        numbers = [
+            node
+            for number, face in faces
+            for node in get_face_nodes(*elements[number], face)
+        ]
+        if not numbers:
+            log.warning(f"Region {name} in {inp_file} has no faces, skipping")
+            continue
+        names.append(name)
+        regions.append(np.searchsorted(nodes, np.unique(numbers)))
+    if not regions:
+        raise ValueError(f"No heat flux surfaces found in {inp_file}")
+    counts = np.array([len(region) for region in regions])
+    log.info(f"Found {len(names)} regions in {inp_file}: {', '.join(names)}")
+    return RegionIndex(
+        names=tuple(names),
+        indices=np.concatenate(regions),
+        offsets=np.concatenate(([0], np.cumsum(counts)[:-1])),
+        counts=counts,
+        points=len(nodes),
+    )
+
+
+def get_stat_names(index: RegionIndex) -> list[str]:
+    """Get names of region statistics in the order of csv columns.
+
+    Keyword arguments:
+    index -- region index
+    """
+    return [f"{name} {stat}" for name in index.names for stat in REGION_STATISTICS]
+
+
+def compute(array: np.ndarray, index: RegionIndex) -> dict[str, np.generic]:
+    """Compute temperature statistics of every region of a single time step.
+
+    Keyword arguments:
+    array -- nodal temperatures [K]
+    index -- region index
+    """
+    if len(array) != index.points:
+        raise ValueError(
+            f"{len(array)} nodal values do not match {index.points} nodes of .inp"
+        )
+    values = array[index.indices]
+    columns = (
+        np.maximum.reduceat(values, index.offsets),
+        np.minimum.reduceat(values, index.offsets),
+        np.add.reduceat(values, index.offsets) / index.counts,
+    )
+    stats = {}
+    for idx, name in enumerate(index.names):
+        for stat, column in zip(REGION_STATISTICS, columns):
+            stats[f"{name} {stat}"] = column[idx]
+    return stats
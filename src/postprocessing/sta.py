@@ -0,0 +1,42 @@
+"""
+CalculiX time stamp file (.sta) parsing.
+
+Kept free of VTK and pandas, so tpost monitor can poll it cheaply.
+"""
+
+# Header lines before the first increment
+HEADER_LINES = 2
+
+
+def parse_sta_line(line: str) -> str | None:
+    """Get time of converged increment from .sta file line.
+
+    Returns None for lines that are not converged increments.
+
+    Keyword arguments:
+    line -- line of .sta file
+    """
+    splited_line = line.split(" ")
+    if len(splited_line) < 12:
+        return None
+    convergence = "".join(splited_line[-12:-10]).isnumeric()
+    step = splited_line[-5:-4][0]
+    if convergence:  # in some case time step entry can be duplicated
+        return step
+    return None
+
+
+def get_timesteps(filename: str) -> list[str]:
+    """Get timesteps from .sta file.
+
+    Keyword arguments
+    filename -- path to .sta file
+    """
+    timesteps = []
+    with open(filename) as f:
+        lines = f.readlines()
+        for line in lines[HEADER_LINES:]:
+            step = parse_sta_line(line)
+            if step is not None:
+                timesteps.append(step)
+    return timesteps
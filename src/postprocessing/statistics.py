@@ -0,0 +1,79 @@
+import vtkmodules.all as vtk
+from vtkmodules.util import numpy_support
+import numpy as np
+
+# Optional statistics in the order of csv columns
+# mean -- nodal mean, wmean -- volume-weighted mean,
+# p50/p95/p99 -- nodal percentiles, hotspot -- point index of the hottest node
+STATISTICS = ("mean", "wmean", "p50", "p95", "p99", "hotspot")
+PERCENTILES = {"p50": 50, "p95": 95, "p99": 99}
+
+
+def get_nodal_volumes(grid: vtk.vtkUnstructuredGrid) -> np.ndarray:
+    """Get volume represented by every node of the mesh.
+
+    Volume of each cell is split equally between its nodes.
+
+    Keyword arguments:
+    grid -- unstructured grid of the simulated mesh
+    """
+    size_filter = vtk.vtkCellSizeFilter()
+    size_filter.SetInputData(grid)
+    size_filter.SetComputeVertexCount(False)
+    size_filter.SetComputeLength(False)
+    size_filter.SetComputeArea(False)
+    size_filter.SetComputeVolume(True)
+    size_filter.Update()
+    volumes = numpy_support.vtk_to_numpy(
+        size_filter.GetOutput().GetCellData().GetArray("Volume")
+    )
+    cells = grid.GetCells()
+    connectivity = numpy_support.vtk_to_numpy(cells.GetConnectivityArray())
+    sizes = np.diff(numpy_support.vtk_to_numpy(cells.GetOffsetsArray()))
+    return np.bincount(
+        connectivity,
+        weights=np.repeat(np.abs(volumes) / sizes, sizes),
+        minlength=grid.GetNumberOfPoints(),
+    )
+
+
+def get_nodal_weights(grid: vtk.vtkUnstructuredGrid) -> np.ndarray:
+    """Get normalized nodal volume weights of the mesh.
+
+    Keyword arguments:
+    grid -- unstructured grid of the simulated mesh
+    """
+    volumes = get_nodal_volumes(grid)
+    return volumes / volumes.sum()
+
+
+def compute(
+    array: np.ndarray,
+    statistics: tuple[str, ...] = (),
+    weights: np.ndarray | None = None,
+) -> dict[str, np.generic]:
+    """Compute temperature statistics of a single time step.
+
+    Maximum and minimum are always computed.
+
+    Keyword arguments:
+    array -- nodal temperatures [K]
+    statistics -- names of optional statistics
+    weights -- normalized nodal volume weights, required by wmean
+    """
+    hotspot = array.argmax()
+    stats: dict[str, np.generic] = {"max": array[hotspot], "min": array.min()}
+    if "mean" in statistics:
+        stats["mean"] = array.mean()
+    if "wmean" in statistics:
+        if weights is None:
+            raise ValueError("Volume-weighted mean requires mesh volumes")
+        stats["wmean"] = np.dot(weights, array)
+    percentiles = [name for name in PERCENTILES if name in statistics]
+    if percentiles:
+        values = np.percentile(array, [PERCENTILES[name] for name in percentiles])
+        stats.update(zip(percentiles, values))
+    if "hotspot" in statistics:
+        # Point index, mapped to the node number by the caller
+        stats["hotspot"] = hotspot
+    return stats
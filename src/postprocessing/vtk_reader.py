@@ -0,0 +1,303 @@
+import vtkmodules.all as vtk
+from vtkmodules.util import numpy_support
+from typing import Iterator
+import numpy as np
+import hashlib
+import mmap
+import re
+
+# Legacy VTK data type names and their NumPy equivalents
+VTK_DTYPES = {
+    "float": np.float32,
+    "double": np.float64,
+    "char": np.int8,
+    "unsigned_char": np.uint8,
+    "short": np.int16,
+    "unsigned_short": np.uint16,
+    "int": np.int32,
+    "unsigned_int": np.uint32,
+    "long": np.int64,
+    "unsigned_long": np.uint64,
+    "vtktypeint64": np.int64,
+    "vtktypeuint64": np.uint64,
+}
+
+# Line starting with a keyword (not a number) ends an ASCII data block
+BLOCK_END = re.compile(rb"\n(?![-+]?(?:nan|inf))[A-Za-z]", re.IGNORECASE)
+
+
+def find_array_id_by_name(point_data: vtk.vtkPointData, name: str) -> int | None:
+    """Find array id by array name.
+
+    Keyword arguments:
+    point_data -- vtk unstructured grid data
+    name -- name of the array to find
+    """
+    for id in range(0, point_data.GetNumberOfArrays()):
+        if point_data.GetArrayName(id) == name:
+            return id
+    return None
+
+
+def read_point_array_vtk(filename: str, name: str = "NT") -> np.ndarray:
+    """Read point array using vtkUnstructuredGridReader.
+
+    Keyword arguments:
+    filename -- path to .vtk file
+    name -- name of the point array
+    """
+    reader = vtk.vtkUnstructuredGridReader()
+    reader.SetFileName(filename)
+    reader.Update()
+    point_data = reader.GetOutput().GetPointData()
+    array_id = find_array_id_by_name(point_data, name)
+    if array_id is None:
+        raise KeyError(f"{name} array not found in {filename}")
+    return numpy_support.vtk_to_numpy(point_data.GetArray(array_id))
+
+
+def find_point_array(
+    data: mmap.mmap | bytes, name: str
+) -> tuple[int, int, int, int, type] | None:
+    """Locate point array values in legacy ASCII .vtk file contents.
+
+    Returns (offset of the first value, offset of the block end,
+    number of components, number of tuples, dtype)
+    or None if the array or the file format is not recognized.
+
+    Keyword arguments:
+    data -- file contents
+    name -- name of the point array
+    """
+    signature = b"# vtk DataFile Version"
+    if data[: len(signature)] != signature:
+        return None
+    header_end = -1
+    for _ in range(3):
+        header_end = data.find(b"\n", header_end + 1)
+    if header_end < 0 or data.rfind(b"\nASCII", 0, header_end + 1) < 0:
+        return None
+    point_data = data.find(b"\nPOINT_DATA ")
+    if point_data < 0:
+        return None
+    cell_data = data.find(b"\nCELL_DATA ", point_data)
+    end = cell_data if cell_data > point_data else len(data)
+    encoded = name.encode()
+
+    # Array stored as field data: "NAME components tuples type"
+    start = data.find(b"\n" + encoded + b" ", point_data, end)
+    if start >= 0:
+        line_end = data.find(b"\n", start + 1)
+        fields = data[start + 1 : line_end].split()
+        if len(fields) != 4 or fields[3].decode() not in VTK_DTYPES:
+            return None
+        block_end = BLOCK_END.search(data, line_end, end)
+        return (
+            line_end + 1,
+            block_end.start() if block_end else end,
+            int(fields[1]),
+            int(fields[2]),
+            VTK_DTYPES[fields[3].decode()],
+        )
+
+    # Array stored as scalars: "SCALARS NAME type [components]" + lookup table
+    start = data.find(b"\nSCALARS " + encoded + b" ", point_data, end)
+    if start >= 0:
+        line_end = data.find(b"\n", start + 1)
+        fields = data[start + 1 : line_end].split()
+        if len(fields) not in (3, 4) or fields[2].decode() not in VTK_DTYPES:
+            return None
+        components = int(fields[3]) if len(fields) == 4 else 1
+        tuples = int(data[point_data + 12 : data.find(b"\n", point_data + 1)])
+        table_end = data.find(b"\n", line_end + 1)
+        if not data[line_end + 1 : table_end].startswith(b"LOOKUP_TABLE"):
+            return None
+        block_end = BLOCK_END.search(data, table_end, end)
+        return (
+            table_end + 1,
+            block_end.start() if block_end else end,
+            components,
+            tuples,
+            VTK_DTYPES[fields[2].decode()],
+        )
+    return None
+
+
+def parse_point_array(data: mmap.mmap | bytes, name: str) -> np.ndarray | None:
+    """Parse a single point array from legacy ASCII .vtk file contents.
+
+    Returns None if the array or the file format is not recognized.
+
+    Keyword arguments:
+    data -- file contents
+    name -- name of the point array
+    """
+    location = find_point_array(data, name)
+    if location is None:
+        return None
+    start, end, components, tuples, dtype = location
+    array = np.fromstring(data[start:end], dtype=np.float64, sep=" ")
+    if array.size != components * tuples:
+        return None
+    if components > 1:
+        array = array.reshape(tuples, components)
+    return array.astype(dtype, copy=False)
+
+
+def get_ascii_fingerprint(data: mmap.mmap | bytes) -> tuple[int, str] | None:
+    """Get number of points and hash of points and cells text.
+
+    Returns None if the file format is not recognized.
+
+    Keyword arguments:
+    data -- legacy ASCII .vtk file contents
+    """
+    start = data.find(b"\nPOINTS ")
+    end = data.find(b"\nPOINT_DATA ", start)
+    if start < 0 or end < 0:
+        return None
+    count = int(data[start + 8 : data.find(b"\n", start + 1)].split()[0])
+    with memoryview(data) as view:
+        digest = hashlib.blake2b(view[start:end], digest_size=16).hexdigest()
+    return count, digest
+
+
+def get_grid_fingerprint(grid: vtk.vtkUnstructuredGrid) -> tuple[int, str]:
+    """Get number of points and hash of points and cells.
+
+    Keyword arguments:
+    grid -- unstructured grid
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(numpy_support.vtk_to_numpy(grid.GetPoints().GetData()).tobytes())
+    digest.update(
+        numpy_support.vtk_to_numpy(grid.GetCells().GetConnectivityArray()).tobytes()
+    )
+    return grid.GetNumberOfPoints(), digest.hexdigest()
+
+
+def read_grid(filename: str) -> vtk.vtkUnstructuredGrid:
+    """Read unstructured grid with vtkUnstructuredGridReader.
+
+    Keyword arguments:
+    filename -- path to .vtk file
+    """
+    reader = vtk.vtkUnstructuredGridReader()
+    reader.SetFileName(filename)
+    reader.Update()
+    return reader.GetOutput()
+
+
+def get_fingerprint(filename: str) -> tuple[int, str]:
+    """Get geometry fingerprint of .vtk file.
+
+    Keyword arguments:
+    filename -- path to .vtk file
+    """
+    with open(filename, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            fingerprint = get_ascii_fingerprint(data)
+    if fingerprint is None:
+        fingerprint = get_grid_fingerprint(read_grid(filename))
+    return fingerprint
+
+
+def read_point_arrays(
+    filename: str,
+    names: tuple[str, ...] = ("NT",),
+    fingerprint: tuple[int, str] | None = None,
+) -> dict[str, np.ndarray]:
+    """Read point arrays from .vtk file without building the grid.
+
+    Falls back to the VTK reader for formats the fast parser does not understand.
+
+    Keyword arguments:
+    filename -- path to .vtk file
+    names -- names of the point arrays
+    fingerprint -- (optional) expected geometry fingerprint, checked if given
+    """
+    with open(filename, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            arrays = {name: parse_point_array(data, name) for name in names}
+            found = get_ascii_fingerprint(data) if fingerprint else None
+    if any(array is None for array in arrays.values()) or (fingerprint and not found):
+        grid = read_grid(filename)
+        point_data = grid.GetPointData()
+        for name in names:
+            array_id = find_array_id_by_name(point_data, name)
+            if array_id is None:
+                raise KeyError(f"{name} array not found in {filename}")
+            arrays[name] = numpy_support.vtk_to_numpy(point_data.GetArray(array_id))
+        if fingerprint and not found:
+            found = get_grid_fingerprint(grid)
+    if fingerprint and found != fingerprint:
+        raise ValueError(f"Mesh in {filename} differs from the rest of the series")
+    return arrays  # type: ignore[return-value]
+
+
+def read_point_array_ascii(filename: str, name: str = "NT") -> np.ndarray | None:
+    """Read a single point array from legacy ASCII .vtk file.
+
+    Only the requested array block is parsed, points and cells are skipped.
+    Returns None if the file format is not supported.
+
+    Keyword arguments:
+    filename -- path to .vtk file
+    name -- name of the point array
+    """
+    with open(filename, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return parse_point_array(data, name)
+
+
+def read_point_array(filename: str, name: str = "NT") -> np.ndarray:
+    """Read point array from .vtk file.
+
+    Uses the fast ASCII parser and falls back to the VTK reader
+    for formats it does not understand.
+
+    Keyword arguments:
+    filename -- path to .vtk file
+    name -- name of the point array
+    """
+    array = read_point_array_ascii(filename, name)
+    if array is None:
+        array = read_point_array_vtk(filename, name)
+    return array
+
+
+class VtkSeries:
+    """Series of .vtk files sharing the mesh of the first file.
+
+    Geometry is parsed only once, from the other files only point arrays
+    are read and their geometry fingerprint is compared with the first file.
+    """
+
+    def __init__(self, files: list[str], names: tuple[str, ...] = ("NT",)):
+        """Read geometry of the series.
+
+        Keyword arguments:
+        files -- list of .vtk files
+        names -- names of the point arrays read from every file
+        """
+        if not files:
+            raise ValueError("Empty .vtk series")
+        self.files = files
+        self.names = names
+        self.grid = read_grid(files[0])
+        self.fingerprint = get_fingerprint(files[0])
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def read(self, idx: int) -> dict[str, np.ndarray]:
+        """Read point arrays of a single time step.
+
+        Keyword arguments:
+        idx -- time step index
+        """
+        return read_point_arrays(self.files[idx], self.names, self.fingerprint)
+
+    def __iter__(self) -> Iterator[dict[str, np.ndarray]]:
+        for idx in range(len(self.files)):
+            yield self.read(idx)
@@ -1,24 +1,31 @@
-import json
 from pathlib import Path
 import logging
 import csv
+import math
 import sys
 import os
 from preprocessing.common import get_config, save_config
 
 log = logging.getLogger()
 
+# Results of a bisection step, used as exit codes of bisect-temperature
+CONVERGED = 0
+NOT_CONVERGED = 1
+OUT_OF_RANGE = 2
+# Root above or below the assumed temperature, see classify
+ABOVE = 3
+BELOW = 4
 
-def bisect_temperature(config_path: str, csv_path: str):
-    """Checks simulation output temperature.
+# Methods choosing the surface temperature of the next simulation
+ROOT_FINDERS = ("bisection", "secant", "illinois", "iqi")
 
-    Compares it with the middle value of the current temperature range.
-    If there is no convergence, update the temperature range for the next simulation.
-    If convergence exit with 0 code
 
-    """
+def get_simulated_temperature(csv_path: str) -> float:
+    """Get the highest simulated temperature [°C] from tpost csv output.
 
-    # Get simulated temp
+    Keyword arguments:
+    csv_path -- path to temperature csv file
+    """
     p = Path(csv_path).resolve().as_posix()
     with open(p, "r") as file:
         csv_reader = csv.DictReader(file)
@@ -27,45 +34,358 @@ def bisect_temperature(config_path: str, csv_path: str):
             value = float(row["max [C]"])
             if temp_sim == 0 or value > temp_sim:
                 temp_sim = value
+    return temp_sim
 
-    # Get config parameters
-    config = get_config(config_path)
+
+def get_candidate_temperature(config: dict) -> float:
+    """Get surface temperature [°C] assumed in the next simulation.
+
+    Root finders store it as "next", bisection uses the middle of the range.
+
+    Keyword arguments:
+    config -- config with the current temperature range
+    """
+    temperature = config["temperature"]
+    if "next" in temperature:
+        return float(temperature["next"])
+    return (temperature["min"] + temperature["max"]) / 2.0
+
+
+def get_bracket_residual(history: list, temp: float) -> float | None:
+    """Get residual (simulated - assumed temperature) of a simulated range bound.
+
+    Returns None for bounds which were not simulated (initial range).
+
+    Keyword arguments:
+    history -- list of [assumed temperature, simulated temperature] pairs
+    temp -- range bound [°C]
+    """
+    for temp_assumed, temp_sim in reversed(history):
+        if temp_assumed == temp:
+            return temp_sim - temp_assumed
+    return None
+
+
+def next_candidate(temperature: dict, history: list, method: str) -> float:
+    """Get surface temperature [°C] assumed in the next simulation.
+
+    Interpolating methods are safeguarded by the current range,
+    if their step falls outside of it the middle of the range is used.
+
+    Keyword arguments:
+    temperature -- temperature settings with the current range
+    history -- list of [assumed temperature, simulated temperature] pairs
+    method -- one of ROOT_FINDERS
+    """
+    low = temperature["min"]
+    high = temperature["max"]
+    middle = (low + high) / 2.0
+    if method == "bisection":
+        return middle
+    x = [temp_assumed for temp_assumed, _ in history]
+    f = [temp_sim - temp_assumed for temp_assumed, temp_sim in history]
+
+    candidate = None
+    if len(history) == 1:
+        # Film coefficients depend weakly on the surface temperature,
+        # so the simulated temperature is a good next guess
+        candidate = history[-1][1]
+    elif method == "illinois":
+        f_low = get_bracket_residual(history, low)
+        f_high = get_bracket_residual(history, high)
+        if f_low is not None and f_high is not None:
+            # Halve the residual of the bound kept by consecutive steps
+            kept = 0
+            while kept + 1 < len(f) and (f[-1] > 0) == (f[-2 - kept] > 0):
+                kept += 1
+            if f[-1] > 0:
+                f_high /= 2**kept
+            else:
+                f_low /= 2**kept
+            candidate = (low * f_high - high * f_low) / (f_high - f_low)
+        else:
+            candidate = history[-1][1]
+    elif method == "iqi" and len(history) >= 3 and len(set(f[-3:])) == 3:
+        # Inverse quadratic interpolation of the last three points
+        (x0, x1, x2), (f0, f1, f2) = x[-3:], f[-3:]
+        candidate = (
+            x0 * f1 * f2 / ((f0 - f1) * (f0 - f2))
+            + x1 * f0 * f2 / ((f1 - f0) * (f1 - f2))
+            + x2 * f0 * f1 / ((f2 - f0) * (f2 - f1))
+        )
+        # Interpolation has to make at least half the progress of bisection
+        if abs(candidate - x[-1]) >= abs(x[-1] - x[-2]) / 2:
+            candidate = None
+    elif f[-1] != f[-2]:
+        # Secant step, also used by iqi until three points are known
+        candidate = x[-1] - f[-1] * (x[-1] - x[-2]) / (f[-1] - f[-2])
+
+    if candidate is None or not low < candidate < high:
+        return middle
+    return candidate
+
+
+def get_remaining_rise(
+    times: list[float], max_temps: list[float], time_end: float | None, window: int
+) -> float:
+    """Estimate how much the maximum temperature [°C] can still rise until time_end.
+
+    Heated parts approach their steady state along a concave curve, so the slope
+    over the last results bounds the slope over the time still to run.
+    Returns infinity until enough results are known.
+
+    Keyword arguments:
+    times -- simulated time [s] of every result written so far
+    max_temps -- maximum temperature [°C] of every result written so far
+    time_end -- (optional) simulation end time [s]
+    window -- number of last results the slope is computed from
+    """
+    if time_end is None or len(max_temps) <= window:
+        return math.inf
+    elapsed = times[-1] - times[-1 - window]
+    if elapsed <= 0:
+        return math.inf
+    slope = (max_temps[-1] - max_temps[-1 - window]) / elapsed
+    return max(slope, 0.0) * max(time_end - times[-1], 0.0)
+
+
+def get_early_decision(
+    times: list[float],
+    max_temps: list[float],
+    time_end: float | None,
+    config: dict,
+    temp_max: float,
+    method: str = "bisection",
+    window: int = 5,
+) -> str | None:
+    """Check if the outcome of a running simulation is already decided.
+
+    Returns the reason to stop the simulation or None to let it continue.
+    Simulated temperature is the maximum over all time steps, so once it
+    exceeds the upper bound of the range it can only stay out of range.
+    Other decisions need the final temperature to stay in the range,
+    which is checked with the rise still possible until the end time.
+    Only bisection uses nothing but the sign of the difference, other methods
+    need the final value and stop only when it can no longer change.
+
+    Keyword arguments:
+    times -- simulated time [s] of every result written so far
+    max_temps -- maximum temperature [°C] of every result written so far
+    time_end -- (optional) simulation end time [s]
+    config -- config with the current temperature range
+    temp_max -- upper bound of the initial range [°C]
+    method -- root finder choosing the next temperature, one of ROOT_FINDERS
+    window -- number of last results the temperature slope is computed from
+    """
+    if not max_temps:
+        return None
     tolerance = config["temperature"]["tolerance"]
-    temp_mid = (config["temperature"]["min"] + config["temperature"]["max"]) / 2.0
-    iteration = os.environ["ITERATION"]
+    temp_sim = max(max_temps)
+    if temp_sim > temp_max:
+        return f"{temp_sim:.2f} °C is above the upper bound of the range"
+    rise = get_remaining_rise(times, max_temps, time_end, window)
+    if temp_sim + rise > temp_max:
+        return None
+    temp_mid = get_candidate_temperature(config)
+    if method == "bisection" and temp_sim - temp_mid > tolerance:
+        return f"{temp_sim:.2f} °C is above {temp_mid} °C by more than tolerance"
+    if rise < tolerance / 2:
+        return (
+            f"maximum temperature {temp_sim:.2f} °C can rise by at most "
+            f"{rise:.2f} °C until {time_end:g} s"
+        )
+    return None
 
-    # Save results to log file
-    logging.info(
-        f"#{iteration} Simulated temp = {temp_sim} Calculated temp = {temp_mid}"
-    )
 
-    # Check if in range
-    if temp_sim < float(os.environ["TMIN"]):
+def classify(
+    temp_sim: float,
+    temp_assumed: float,
+    tolerance: float,
+    temp_min: float,
+    temp_max: float,
+) -> int:
+    """Compare simulated temperature with the assumed one and the initial range.
+
+    Returns CONVERGED, OUT_OF_RANGE, ABOVE when the root is above
+    the assumed temperature or BELOW when it is below.
+
+    Keyword arguments:
+    temp_sim -- simulated temperature [°C]
+    temp_assumed -- surface temperature assumed in the simulation [°C]
+    tolerance -- maximum difference of converged temperatures [°C]
+    temp_min -- lower bound of the initial range [°C]
+    temp_max -- upper bound of the initial range [°C]
+    """
+    if temp_sim < temp_min:
         logging.error(
             "Simulated temperature is below the lower bound of the range. Reduce the lower limit of the range."
         )
-        sys.exit(2)
-    if temp_sim > float(os.environ["TMAX"]):
+        return OUT_OF_RANGE
+    if temp_sim > temp_max:
         logging.error(
             "Simulated temperature is above the upper bound of the range. Increase the upper limit of the range."
         )
-        sys.exit(2)  # Out of range exit code 2
+        return OUT_OF_RANGE
+    if abs(temp_sim - temp_assumed) <= tolerance:
+        return CONVERGED
+    return ABOVE if temp_sim > temp_assumed else BELOW
+
+
+def bisect_step(
+    config: dict,
+    temp_sim: float,
+    temp_min: float,
+    temp_max: float,
+    iteration: int,
+    method: str = "bisection",
+) -> int:
+    """Compare simulated temperature with the assumed surface temperature.
+
+    Updates the temperature range and the next assumed temperature in config,
+    or sets "bisected_temp" on convergence.
+    Returns CONVERGED, NOT_CONVERGED or OUT_OF_RANGE.
+
+    Keyword arguments:
+    config -- config with the current temperature range
+    temp_sim -- simulated temperature [°C]
+    temp_min -- lower bound of the initial range [°C]
+    temp_max -- upper bound of the initial range [°C]
+    iteration -- number of the iteration, used in logs
+    method -- root finder choosing the next temperature, one of ROOT_FINDERS
+    """
+    temperature = config["temperature"]
+    temp_mid = get_candidate_temperature(config)
+
+    # Save results to log file
+    logging.info(
+        f"#{iteration} Simulated temp = {temp_sim} Calculated temp = {temp_mid}"
+    )
+
+    side = classify(temp_sim, temp_mid, temperature["tolerance"], temp_min, temp_max)
+    if side == OUT_OF_RANGE:
+        return OUT_OF_RANGE
 
     # Break condition
-    if abs(temp_sim - temp_mid) <= tolerance:
+    if side == CONVERGED:
         config["bisected_temp"] = temp_mid
-        with open(config_path, "w") as file:
-            json.dump(config, file)
         logging.info(f"CONVERGENCE T = {temp_mid}")
-        sys.exit(0)  # Convergence achieved exit code 0
+        return CONVERGED
 
     # Continue conditions
-    if temp_sim > temp_mid:
-        config["temperature"]["min"] = temp_mid
+    if side == ABOVE:
+        temperature["min"] = temp_mid
     else:
-        config["temperature"]["max"] = temp_mid
+        temperature["max"] = temp_mid
+    history = temperature.setdefault("history", [])
+    history.append([temp_mid, temp_sim])
+    temperature["next"] = next_candidate(temperature, history, method)
     logging.info(
-        f'NO CONVERGENCE -> New range = [{config["temperature"]["min"]} , {config["temperature"]["max"]}]'
+        f'NO CONVERGENCE -> New range = [{temperature["min"]} , {temperature["max"]}]'
+        f', next temp = {temperature["next"]}'
+    )
+    return NOT_CONVERGED
+
+
+def get_ksection_candidates(config: dict, count: int) -> list[float]:
+    """Split the current temperature range into count + 1 equal parts.
+
+    Keyword arguments:
+    config -- config with the current temperature range
+    count -- number of candidate temperatures
+    """
+    low = config["temperature"]["min"]
+    high = config["temperature"]["max"]
+    return [low + i * (high - low) / (count + 1) for i in range(1, count + 1)]
+
+
+def ksection_step(
+    config: dict,
+    results: list[tuple[float, float]],
+    temp_min: float,
+    temp_max: float,
+    iteration: int,
+) -> int:
+    """Classify every candidate of a round and narrow the range once.
+
+    Returns CONVERGED, NOT_CONVERGED or OUT_OF_RANGE.
+
+    Keyword arguments:
+    config -- config with the current temperature range
+    results -- (assumed temperature, simulated temperature) of every candidate [°C]
+    temp_min -- lower bound of the initial range [°C]
+    temp_max -- upper bound of the initial range [°C]
+    iteration -- number of the round, used in logs
+    """
+    temperature = config["temperature"]
+    tolerance = temperature["tolerance"]
+    sides = []
+    for temp_assumed, temp_sim in results:
+        logging.info(
+            f"#{iteration} Simulated temp = {temp_sim} Calculated temp = {temp_assumed}"
+        )
+        sides.append(classify(temp_sim, temp_assumed, tolerance, temp_min, temp_max))
+    temperature.setdefault("history", []).extend(
+        [temp_assumed, temp_sim] for temp_assumed, temp_sim in results
+    )
+
+    # The closest converged candidate wins
+    converged = [
+        (abs(temp_sim - temp_assumed), temp_assumed)
+        for side, (temp_assumed, temp_sim) in zip(sides, results)
+        if side == CONVERGED
+    ]
+    if converged:
+        config["bisected_temp"] = min(converged)[1]
+        logging.info(f"CONVERGENCE T = {config['bisected_temp']}")
+        return CONVERGED
+    if OUT_OF_RANGE in sides:
+        return OUT_OF_RANGE
+
+    low = max(
+        [temperature["min"]]
+        + [temp for side, (temp, _) in zip(sides, results) if side == ABOVE]
+    )
+    high = min(
+        [temperature["max"]]
+        + [temp for side, (temp, _) in zip(sides, results) if side == BELOW]
+    )
+    if low >= high:
+        logging.error(
+            "Simulated temperature is not monotone in the assumed temperature."
+        )
+        return OUT_OF_RANGE
+    temperature["min"] = low
+    temperature["max"] = high
+    temperature.pop("next", None)
+    logging.info(f"NO CONVERGENCE -> New range = [{low} , {high}]")
+    return NOT_CONVERGED
+
+
+def bisect_temperature(config_path: str, csv_path: str, method: str = "bisection"):
+    """Checks simulation output temperature.
+
+    Compares it with the surface temperature assumed in the simulation.
+    If there is no convergence, update the temperature range and choose
+    the temperature for the next simulation with the given method.
+    If convergence exit with 0 code
+
+    """
+
+    # Get simulated temp
+    temp_sim = get_simulated_temperature(csv_path)
+
+    # Get config parameters
+    config = get_config(config_path)
+    iteration = int(os.environ["ITERATION"])
+
+    result = bisect_step(
+        config,
+        temp_sim,
+        float(os.environ["TMIN"]),
+        float(os.environ["TMAX"]),
+        iteration,
+        method,
     )
-    save_config(config, config_path)
-    sys.exit(1)  # No convergence exit code 1
+    if result != OUT_OF_RANGE:
+        save_config(config, config_path)
+    sys.exit(result)  # 0 - convergence, 1 - no convergence, 2 - out of range
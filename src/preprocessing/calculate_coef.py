@@ -1,48 +1,137 @@
+import numpy as np
+import numpy.typing as npt
 import logging
 
-# Air properties in 20ºC due to
-# https://calcdevice.com/natural-convection-of-vertical-surface-id128.html
-fluid_thermal_conductivity = 0.0259  # W/m*ºC
-dynamic_viscosity = 0.000018  # Pa*s
-fluid_specific_heat = 1005  # J/kg*⁰C
-volumetric_expansion = 0.00365  # 1/⁰C
-density = 1.205  # kg/m³
 gravity = 9.80665  # m/s^2
 
 log = logging.getLogger(__name__)
 
 
-def calculate_film_coefficient(
-    temp_fluid: float, temp_surface: float, orientation: str, length: float
-):
-    # Characteristic length [mm]
-    length = length / 1000
-    # Nusselt number coefficients for natural convection due to
-    # https://www.sfu.ca/~mbahrami/ENSC%20388/Notes/Natural%20Convection.pdf#page=4
-    n = 0.25
-    if orientation == "vertical":
-        c = 0.59
-    elif orientation == "horizontal_up":
-        c = 0.54
-    elif orientation == "horizontal_down":
-        c = 0.27
-    # fmt: off
-    if temp_fluid > temp_surface:
+# Nusselt number coefficients C of Nu = C * Ra^n for natural convection
+NUSSELT_COEFFICIENTS = {
+    "vertical": 0.59,
+    "horizontal_up": 0.54,
+    "horizontal_down": 0.27,
+}
+NUSSELT_EXPONENT = 0.25
+
+# Properties of dry air at atmospheric pressure due to
+# Cengel, Heat and Mass Transfer, table A-15. Columns: temperature [ºC],
+# thermal conductivity [W/m*ºC], dynamic viscosity [Pa*s], density [kg/m³],
+# specific heat [J/kg*⁰C]
+AIR_PROPERTIES = np.array(
+    [
+        [0, 0.02364, 1.729e-05, 1.292, 1006],
+        [20, 0.02514, 1.825e-05, 1.204, 1007],
+        [40, 0.02662, 1.918e-05, 1.127, 1007],
+        [60, 0.02808, 2.008e-05, 1.059, 1007],
+        [80, 0.02953, 2.096e-05, 0.9994, 1008],
+        [100, 0.03095, 2.181e-05, 0.9458, 1009],
+        [120, 0.03235, 2.264e-05, 0.8977, 1011],
+        [140, 0.03374, 2.345e-05, 0.8542, 1013],
+        [160, 0.03511, 2.420e-05, 0.8148, 1016],
+        [180, 0.03646, 2.504e-05, 0.7788, 1019],
+        [200, 0.03779, 2.577e-05, 0.7459, 1023],
+        [250, 0.04104, 2.760e-05, 0.6746, 1033],
+        [300, 0.04418, 2.934e-05, 0.6158, 1044],
+        [350, 0.04721, 3.101e-05, 0.5664, 1056],
+        [400, 0.05015, 3.261e-05, 0.5243, 1069],
+    ]
+)
+AIR_TEMPERATURE = AIR_PROPERTIES[:, 0]
+# Ideal gas
+AIR_VOLUMETRIC_EXPANSION = 1 / (AIR_TEMPERATURE + 273.15)  # 1/⁰C
+
+
+def get_air_properties(temp_film: np.ndarray) -> dict[str, np.ndarray]:
+    """Interpolate air properties at film temperatures.
+
+    Temperatures outside of the property table use its closest row.
+
+    Keyword arguments:
+    temp_film -- mean of the fluid and surface temperatures [ºC]
+    """
+    return {
+        name: np.interp(temp_film, AIR_TEMPERATURE, values)
+        for name, values in (
+            ("conductivity", AIR_PROPERTIES[:, 1]),
+            ("viscosity", AIR_PROPERTIES[:, 2]),
+            ("density", AIR_PROPERTIES[:, 3]),
+            ("specific_heat", AIR_PROPERTIES[:, 4]),
+            ("expansion", AIR_VOLUMETRIC_EXPANSION),
+        )
+    }
+
+
+def calculate_film_coefficients(
+    temp_fluid: float,
+    temp_surface: npt.ArrayLike,
+    orientation: npt.ArrayLike,
+    length: npt.ArrayLike,
+) -> np.ndarray:
+    """Calculate film coefficients [W/m^2/K] of many surfaces at once.
+
+    Air properties are taken at the film temperature. Arguments are broadcast.
+
+    Keyword arguments:
+    temp_fluid -- ambient fluid temperature [ºC]
+    temp_surface -- surface temperatures [ºC]
+    orientation -- surface orientations, keys of NUSSELT_COEFFICIENTS
+    length -- characteristic lengths [mm]
+    """
+    temp_surface = np.asarray(temp_surface, dtype=float)
+    if np.any(temp_surface < temp_fluid):
         raise Exception("TEMP_FLUID higher than TEMP_SURFACE")
+    c = np.vectorize(NUSSELT_COEFFICIENTS.__getitem__, otypes=[float])(orientation)
+    length = np.asarray(length, dtype=float) / 1000
+    air = get_air_properties((temp_surface + temp_fluid) / 2)
+    # fmt: off
     grashof_number = (
-        gravity * pow(length, 3) * volumetric_expansion * (temp_surface - temp_fluid)
-        / pow((dynamic_viscosity / density), 2)
+        gravity * length**3 * air["expansion"] * (temp_surface - temp_fluid)
+        / (air["viscosity"] / air["density"]) ** 2
     )
-    prandtl_number = dynamic_viscosity * fluid_specific_heat / fluid_thermal_conductivity
-    rayleigh_number = grashof_number * prandtl_number
-    nusselt_number = c * pow(rayleigh_number, n)
-    film_coefficient = nusselt_number * fluid_thermal_conductivity / length
+    prandtl_number = air["viscosity"] * air["specific_heat"] / air["conductivity"]
+    nusselt_number = c * (grashof_number * prandtl_number) ** NUSSELT_EXPONENT
     # fmt: on
-    heat_flow = film_coefficient * (temp_surface - temp_fluid)
-    logging.debug(f"Grashof_number = {grashof_number}")
-    logging.debug(f"Prandtl_number = {prandtl_number}")
-    logging.debug(f"Rayleigh_number = {rayleigh_number}")
-    logging.debug(f"Nusselt_number = {nusselt_number}")
+    return nusselt_number * air["conductivity"] / length
+
+
+def calculate_film_coefficient(
+    temp_fluid: float, temp_surface: float, orientation: str, length: float
+) -> float:
+    """Calculate film coefficient [W/m^2/K] of a single surface.
+
+    Keyword arguments:
+    temp_fluid -- ambient fluid temperature [ºC]
+    temp_surface -- surface temperature [ºC]
+    orientation -- surface orientation, key of NUSSELT_COEFFICIENTS
+    length -- characteristic length [mm]
+    """
+    film_coefficient = float(
+        calculate_film_coefficients(temp_fluid, temp_surface, orientation, length)
+    )
     logging.debug(f"Film coefficient = {film_coefficient}")
-    logging.debug(f"Heat flow = {heat_flow}")
+    logging.debug(f"Heat flow = {film_coefficient * (temp_surface - temp_fluid)}")
     return film_coefficient
+
+
+def lookup_film_coefficients(
+    temp_fluid: float, temp_surface: float, surfaces: dict[str, list]
+) -> dict[str, float]:
+    """Get film coefficients of surfaces by name.
+
+    All surfaces are calculated in a single vectorized call.
+
+    Keyword arguments:
+    temp_fluid -- ambient fluid temperature [ºC]
+    temp_surface -- surface temperature [ºC]
+    surfaces -- [characteristic length [mm], orientation] by surface name,
+                as stored in the film section of config
+    """
+    if not surfaces:
+        return {}
+    lengths, orientations = zip(*surfaces.values())
+    films = calculate_film_coefficients(
+        temp_fluid, temp_surface, list(orientations), list(lengths)
+    )
+    return {name: float(film) for name, film in zip(surfaces, films)}
@@ -1,6 +1,9 @@
 import json
 from pathlib import Path
 
+# Job name of the .inp file written by FreeCAD
+JOB_NAME = "FEMMeshGmsh"
+
 
 def get_config(config_path: str) -> dict:
     with open(Path(config_path).resolve().as_posix(), "r") as file:
@@ -0,0 +1,402 @@
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import time
+import logging
+from contextlib import contextmanager, redirect_stdout
+from functools import partial
+from pathlib import Path
+from typing import Callable
+import os
+from preprocessing import bisection
+from preprocessing import parse_fcstd
+from preprocessing import patch_inp
+from preprocessing import solver
+from preprocessing.common import JOB_NAME, get_config
+
+log = logging.getLogger(__name__)
+
+
+def reduce_results(frd: Path, workdir: str) -> float:
+    """Write temperature.csv from .frd file and return the highest temperature [°C].
+
+    Keyword arguments:
+    frd -- path to CalculiX result file
+    workdir -- directory with the .sta file and the output csv
+    """
+    # VTK and pandas are loaded only when results are reduced
+    from postprocessing import create_csv
+
+    csv_path = (Path(workdir) / "temperature.csv").as_posix()
+    with open(os.devnull, "w") as devnull:
+        with redirect_stdout(devnull):
+            create_csv.main(
+                "",
+                frd.with_suffix(".sta").as_posix(),
+                csv_path,
+                frd_file=frd.as_posix(),
+            )
+    return bisection.get_simulated_temperature(csv_path)
+
+
+def simulate(
+    doc,
+    fcstd: str,
+    workdir: str,
+    tools: dict,
+    steady_state: bool = False,
+    should_stop: (
+        Callable[[list[float], list[float], float | None], str | None] | None
+    ) = None,
+) -> tuple[dict, float, dict]:
+    """Generate .inp from the open design, run CalculiX and reduce its results.
+
+    Returns simulation parameters, the highest simulated temperature [°C]
+    and time spent in every stage [s].
+
+    Keyword arguments:
+    doc -- open FreeCAD document
+    fcstd -- path to FreeCAD design file
+    workdir -- directory for .inp, results and simulation.json
+    tools -- FreeCAD and CalculiX versions
+    steady_state -- run steady state instead of transient analysis
+    should_stop -- (optional) decides when to stop CalculiX early
+    """
+    start = time.perf_counter()
+    params = parse_fcstd.get_simulation_params(doc, fcstd, tools, steady_state)
+    parse_fcstd.generate_inp(Path(workdir).resolve().as_posix())
+    timings = {"inp": time.perf_counter() - start}
+    time_end = float(params["Solver Configuration"]["Time End"])
+    temp_sim, solve_timings = solve(workdir, time_end, should_stop)
+    return params, temp_sim, {**timings, **solve_timings}
+
+
+def solve(
+    workdir: str,
+    time_end: float,
+    should_stop: (
+        Callable[[list[float], list[float], float | None], str | None] | None
+    ) = None,
+) -> tuple[float, dict]:
+    """Run CalculiX on the .inp in workdir and reduce its results.
+
+    Returns the highest simulated temperature [°C] and time spent in every stage [s].
+
+    Keyword arguments:
+    workdir -- directory for .inp, results and simulation.json
+    time_end -- simulation end time [s]
+    should_stop -- (optional) decides when to stop CalculiX early
+    """
+    timings = {}
+    start = time.perf_counter()
+    if should_stop is not None:
+        frd = solver.run_ccx_supervised(workdir, should_stop, time_end)
+    else:
+        frd = solver.run_ccx(workdir)
+    timings["ccx"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    temp_sim = reduce_results(frd, workdir)
+    timings["csv"] = time.perf_counter() - start
+    return temp_sim, timings
+
+
+@contextmanager
+def restore_transient(doc, steady_state: bool):
+    """Switch the solver back to transient analysis on exit of steady state runs.
+
+    Keyword arguments:
+    doc -- open FreeCAD document, saved with the user's analysis type
+    steady_state -- iterations run as steady state analysis
+    """
+    try:
+        yield
+    finally:
+        if steady_state:
+            parse_fcstd.set_solver(doc)
+
+
+def log_timings(name: str, timings: dict) -> None:
+    """Log time spent in every stage of an iteration."""
+    logging.info(
+        f"{name} timings: "
+        + ", ".join(f"{stage} {seconds:.2f} s" for stage, seconds in timings.items())
+        + f", total {sum(timings.values()):.2f} s"
+    )
+
+
+def run(
+    fcstd: str,
+    workdir: str,
+    config_path: str,
+    max_iterations: int = 20,
+    method: str = "bisection",
+    early_stop: bool = False,
+    steady_state: bool = False,
+    patch: bool = False,
+) -> int:
+    """Find film coefficients with bisection, keeping FreeCAD and the design loaded.
+
+    In-process equivalent of find_coef.sh, config file is not modified.
+    Mode and result of every iteration are saved in simulation.json.
+    Returns result of the last bisection step (bisection.CONVERGED on success).
+
+    Keyword arguments:
+    fcstd -- path to FreeCAD design file
+    workdir -- directory for .inp, results and simulation.json
+    config_path -- path to config file with film and temperature settings
+    max_iterations -- stop after given number of iterations
+    method -- root finder choosing the next temperature, see bisection.ROOT_FINDERS
+    early_stop -- stop CalculiX once the outcome of the iteration is decided
+    steady_state -- run iterations as steady state analysis, followed by
+                    a single transient run after convergence
+    patch -- generate .inp with FreeCAD only in the first iteration and patch
+             its film coefficients in the next ones, see patch_inp
+    """
+    config = get_config(config_path)
+    # Absolute boundaries of the temperature range
+    temp_min = float(config["temperature"]["min"])
+    temp_max = float(config["temperature"]["max"])
+    mode = "steady state" if steady_state else "transient"
+
+    start = time.perf_counter()
+    # Coefficients of the last iteration are kept in the design saved on exit
+    with (
+        parse_fcstd.FcstdSession(fcstd) as session,
+        restore_transient(session.doc, steady_state),
+    ):
+        tools = parse_fcstd.get_tools_versions()
+        logging.info(f"Loaded {fcstd} in {time.perf_counter() - start:.2f} s")
+
+        iterations = {}
+        result = bisection.NOT_CONVERGED
+        # Input deck of the first iteration, patched in the next ones
+        inp_path = (Path(workdir) / f"{JOB_NAME}.inp").as_posix()
+        inp_lines: list[str] = []
+        inp_index: dict = {}
+        params: dict = {}
+        time_end = 0.0
+        for iteration in range(1, max_iterations + 1):
+            logging.info("")
+            logging.info(f"------------------ #{iteration} Iteration ({mode})")
+
+            should_stop = None
+            if early_stop:
+                should_stop = partial(
+                    bisection.get_early_decision,
+                    config=config,
+                    temp_max=temp_max,
+                    method=method,
+                )
+            temp_assumed = bisection.get_candidate_temperature(config)
+            if inp_lines:
+                start = time.perf_counter()
+                films = patch_inp.get_films(inp_lines, inp_index, config)
+                patch_inp.patch_films(inp_lines, inp_index, films)
+                patch_inp.write_inp(inp_path, inp_lines)
+                timings = {"patch inp": time.perf_counter() - start}
+                for label, film in films.items():
+                    logging.info(f"{label} = {film}")
+                    params["Heat Dissipation"][label] = {"Film Coef": film}
+                temp_sim, solve_timings = solve(workdir, time_end, should_stop)
+                timings.update(solve_timings)
+            else:
+                start = time.perf_counter()
+                films = parse_fcstd.apply_film_coefs(session, config)
+                film_time = time.perf_counter() - start
+                params, temp_sim, timings = simulate(
+                    session.doc, fcstd, workdir, tools, steady_state, should_stop
+                )
+                timings = {"film coefs": film_time, **timings}
+                time_end = float(params["Solver Configuration"]["Time End"])
+                if patch:
+                    inp_lines = patch_inp.read_inp(inp_path)
+                    inp_index = patch_inp.index_films(inp_lines)
+
+            result = bisection.bisect_step(
+                config, temp_sim, temp_min, temp_max, iteration, method
+            )
+            log_timings(f"#{iteration}", timings)
+            iterations[f"Iteration {iteration}"] = {
+                "Mode": mode,
+                "Assumed Temperature": temp_assumed,
+                "Simulated Temperature": temp_sim,
+            }
+            params["Bisection"] = iterations
+            parse_fcstd.save_simulation_params(params, workdir)
+            if result != bisection.NOT_CONVERGED:
+                break
+        else:
+            logging.error(f"No convergence after {max_iterations} iterations")
+
+        if inp_lines:
+            # Design gets film coefficients of the last patched iteration
+            for label, film in films.items():
+                session.set_coef("film", film, label)
+        if result == bisection.CONVERGED and steady_state:
+            # Film coefficients of the converged iteration are still applied
+            run_transient(session.doc, fcstd, workdir, tools, config, iterations)
+    return result
+
+
+def run_transient(
+    doc, fcstd: str, workdir: str, tools: dict, config: dict, iterations: dict
+) -> None:
+    """Run transient simulation with the film coefficients applied to the design.
+
+    Keyword arguments:
+    doc -- open FreeCAD document
+    fcstd -- path to FreeCAD design file
+    workdir -- directory for .inp, results and simulation.json
+    tools -- FreeCAD and CalculiX versions
+    config -- config with the converged temperature
+    iterations -- records of the previous iterations, saved in simulation.json
+    """
+    logging.info("")
+    logging.info("------------------ Transient run of the converged iteration")
+    params, temp_sim, timings = simulate(doc, fcstd, workdir, tools)
+    log_timings("Transient run", timings)
+    logging.info(f"Transient simulated temp = {temp_sim}")
+    iterations["Final"] = {
+        "Mode": "transient",
+        "Assumed Temperature": config["bisected_temp"],
+        "Simulated Temperature": temp_sim,
+    }
+    params["Bisection"] = iterations
+    parse_fcstd.save_simulation_params(params, workdir)
+
+
+def run_parallel(
+    fcstd: str,
+    workdir: str,
+    config_path: str,
+    candidates: int,
+    cores: int | None = None,
+    max_iterations: int = 20,
+    early_stop: bool = False,
+    steady_state: bool = False,
+) -> int:
+    """Find film coefficients with k-section, simulating several temperatures at once.
+
+    Every round splits the current range into candidates + 1 parts and runs
+    CalculiX for every candidate in its own directory (<workdir>/candidate_<n>)
+    with an equal share of the cores. The range is then narrowed with
+    the bisection rule applied to every candidate.
+    Returns result of the last round (bisection.CONVERGED on success).
+
+    Keyword arguments:
+    fcstd -- path to FreeCAD design file
+    workdir -- directory for candidate directories and simulation.json
+    config_path -- path to config file with film and temperature settings
+    candidates -- number of temperatures simulated in every round
+    cores -- number of cores split between CalculiX jobs, all by default
+    max_iterations -- stop after given number of rounds
+    early_stop -- stop CalculiX once the outcome of the candidate is decided
+    steady_state -- run rounds as steady state analysis, followed by
+                    a single transient run after convergence
+    """
+    config = get_config(config_path)
+    # Absolute boundaries of the temperature range
+    temp_min = float(config["temperature"]["min"])
+    temp_max = float(config["temperature"]["max"])
+    mode = "steady state" if steady_state else "transient"
+    threads = max(1, (cores or os.cpu_count() or 1) // candidates)
+    directories = [Path(workdir) / f"candidate_{n}" for n in range(candidates)]
+    for directory in directories:
+        directory.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    with (
+        parse_fcstd.FcstdSession(fcstd) as session,
+        restore_transient(session.doc, steady_state),
+    ):
+        tools = parse_fcstd.get_tools_versions()
+        logging.info(f"Loaded {fcstd} in {time.perf_counter() - start:.2f} s")
+        logging.info(f"Running {candidates} CalculiX jobs with {threads} threads each")
+
+        iterations = {}
+        result = bisection.NOT_CONVERGED
+        for iteration in range(1, max_iterations + 1):
+            logging.info("")
+            logging.info(f"------------------ #{iteration} Round ({mode})")
+            temps = bisection.get_ksection_candidates(config, candidates)
+            logging.info(f"Candidate temps = {', '.join(f'{t:g}' for t in temps)}")
+
+            # FreeCAD is not thread safe, inputs are generated one by one
+            start = time.perf_counter()
+            candidate_configs = []
+            for temp, directory in zip(temps, directories):
+                candidate_config = copy.deepcopy(config)
+                candidate_config["temperature"]["next"] = temp
+                candidate_configs.append(candidate_config)
+                parse_fcstd.apply_film_coefs(session, candidate_config)
+                params = parse_fcstd.get_simulation_params(
+                    session.doc, fcstd, tools, steady_state
+                )
+                session.doc.saveCopy(
+                    (directory / Path(fcstd).name).resolve().as_posix()
+                )
+                parse_fcstd.generate_inp(directory.resolve().as_posix())
+            timings = {"inp": time.perf_counter() - start}
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=candidates) as executor:
+                if early_stop:
+                    time_end = float(params["Solver Configuration"]["Time End"])
+                    jobs = [
+                        executor.submit(
+                            solver.run_ccx_supervised,
+                            directory.as_posix(),
+                            partial(
+                                bisection.get_early_decision,
+                                config=candidate_config,
+                                temp_max=temp_max,
+                            ),
+                            time_end,
+                            threads=threads,
+                        )
+                        for directory, candidate_config in zip(
+                            directories, candidate_configs
+                        )
+                    ]
+                else:
+                    jobs = [
+                        executor.submit(
+                            solver.run_ccx, directory.as_posix(), threads=threads
+                        )
+                        for directory in directories
+                    ]
+                frds = [job.result() for job in jobs]
+            timings["ccx"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            temps_sim = [
+                reduce_results(frd, directory.as_posix())
+                for frd, directory in zip(frds, directories)
+            ]
+            timings["csv"] = time.perf_counter() - start
+
+            result = bisection.ksection_step(
+                config, list(zip(temps, temps_sim)), temp_min, temp_max, iteration
+            )
+            log_timings(f"#{iteration}", timings)
+            for n, (temp, temp_sim) in enumerate(zip(temps, temps_sim)):
+                iterations[f"Iteration {iteration} candidate {n}"] = {
+                    "Mode": mode,
+                    "Assumed Temperature": temp,
+                    "Simulated Temperature": temp_sim,
+                }
+            params["Bisection"] = iterations
+            parse_fcstd.save_simulation_params(params, workdir)
+            if result != bisection.NOT_CONVERGED:
+                break
+        else:
+            logging.error(f"No convergence after {max_iterations} rounds")
+
+        if result == bisection.CONVERGED:
+            winner = temps.index(config["bisected_temp"])
+            logging.info(f"Converged results are in {directories[winner]}")
+            # Restore film coefficients of the converged candidate
+            parse_fcstd.apply_film_coefs(session, candidate_configs[winner])
+            if steady_state:
+                run_transient(session.doc, fcstd, workdir, tools, config, iterations)
+    return result
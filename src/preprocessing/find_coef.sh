@@ -2,6 +2,7 @@
 
 fcstd_path=$1
 designs=$2
+method=${3:-bisection}
 ITERATION=0
 cp "$designs"/config.json "$designs"/temp_config.json
 trap 'rm -f "$designs"/temp_config.json' EXIT
@@ -20,7 +21,7 @@ while true; do
     mkdir -p "$designs"/vtk
     mv "$designs"/*.vtk "$designs"/vtk/
     tpost csv --vtk "$designs"/vtk --sta "$designs"/FEMMeshGmsh.sta --output "$designs"/temperature.csv > /dev/null 2>&1
-    tpre bisect-temperature --config "$designs"/temp_config.json --csv "$designs"/temperature.csv
+    tpre bisect-temperature --config "$designs"/temp_config.json --csv "$designs"/temperature.csv --method "$method"
     python_exit_code=$?
     if [ $python_exit_code -eq 0 ]; then
         break
@@ -0,0 +1,267 @@
+"""
+Content-addressed cache of .inp files generated by FreeCAD.
+
+Entries are keyed by a hash of the .FCStd file, the solver setup and the tool
+installations, and hold the generated .inp file, simulation parameters and the
+design saved after the solver setup. The entry is also linked under the hash of
+the saved design, so a design already prepared by parse-fcstd hits the cache too.
+Least recently used entries are evicted when the cache exceeds its size.
+
+A cache hit neither imports FreeCAD nor starts CalculiX.
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from preprocessing.common import JOB_NAME
+
+log = logging.getLogger(__name__)
+
+# Bump when the layout of cache entries changes
+CACHE_VERSION = 2
+PARAMS_FILE = "simulation.json"
+DESIGN_FILE = "design.FCStd"
+# Maximum size of the cache [bytes]
+DEFAULT_SIZE = 1 << 30
+# Files of FREECAD_PATH identifying FreeCAD version and its .inp writer
+FREECAD_FILES = (
+    "usr/lib/libFreeCADApp*",
+    "usr/Mod/Fem/**/*.py",
+    "usr/lib/python3.11/site-packages/femtools/*.py",
+)
+# Staged entries older than this are left over by crashed runs [s]
+STALE_AGE = 3600
+
+
+def hash_file(filename: str) -> str:
+    """Get hash of file contents."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_files(root: Path, patterns: Tuple[str, ...]) -> Optional[str]:
+    """Get hash of names and contents of files matching glob patterns.
+
+    Returns None if no file matches.
+    """
+    files = sorted({file for pattern in patterns for file in root.glob(pattern)})
+    if not files:
+        return None
+    digest = hashlib.blake2b(digest_size=20)
+    for file in files:
+        digest.update(f"{file.relative_to(root)}:{hash_file(file.as_posix())}".encode())
+    return digest.hexdigest()
+
+
+def get_tools_fingerprint() -> Dict:
+    """Identify FreeCAD and CalculiX installations without starting them.
+
+    Contents of the FreeCAD library, the .inp writer and the ccx binary
+    change with the versions reported by the tools, so their hashes stand in
+    for the versions.
+    """
+    freecad_path = os.environ.get("FREECAD_PATH")
+    ccx = shutil.which("ccx")
+    return {
+        "FreeCAD": (
+            hash_files(Path(freecad_path), FREECAD_FILES) if freecad_path else None
+        ),
+        "CalculiX": hash_file(ccx) if ccx else None,
+    }
+
+
+def get_key(design_hash: str, steady_state: bool, tools: Dict) -> str:
+    """Get cache key of a design.
+
+    Solver setup done by set_solver depends only on the design
+    and the analysis type, so these determine the generated .inp.
+
+    Keyword arguments:
+    design_hash -- hash of .FCStd file, see hash_file
+    steady_state -- steady state instead of transient analysis
+    tools -- FreeCAD and CalculiX installations, see get_tools_fingerprint
+    """
+    setup = json.dumps(
+        {
+            "version": CACHE_VERSION,
+            "design": design_hash,
+            "steady_state": steady_state,
+            "tools": tools,
+        },
+        sort_keys=True,
+    )
+    return hashlib.blake2b(setup.encode(), digest_size=20).hexdigest()
+
+
+def get_design_key(fcstd: str, steady_state: bool) -> str:
+    """Get cache key of the current contents of a design file."""
+    return get_key(hash_file(fcstd), steady_state, get_tools_fingerprint())
+
+
+def restore(cache_dir: str, key: str, fcstd: str, inp_file: str, log_dir: str) -> bool:
+    """Restore .inp file, simulation parameters and design of a cache entry.
+
+    Returns False if the key is not cached.
+
+    Keyword arguments:
+    cache_dir -- path to cache directory
+    key -- cache key, see get_key
+    fcstd -- path to FreeCAD design file, saved with the solver setup,
+             the original is backed up to .FCBak file
+    inp_file -- path to restored .inp file
+    log_dir -- directory of restored simulation parameters
+    """
+    entry = Path(cache_dir) / key
+    try:
+        with open(entry / PARAMS_FILE, "r") as f:
+            params = json.load(f)
+        shutil.copyfile(entry / Path(inp_file).name, inp_file)
+        if hash_file((entry / DESIGN_FILE).as_posix()) != hash_file(fcstd):
+            # parse-fcstd saves the solver setup in the design as well
+            backup = Path(fcstd).with_suffix(".FCBak")
+            shutil.copyfile(fcstd, backup)
+            shutil.copyfile(entry / DESIGN_FILE, fcstd)
+            logging.info(
+                f"Saved cached solver setup in {fcstd}, original design backed up to {backup}"
+            )
+    except (OSError, ValueError):
+        return False
+    # Mark as recently used
+    os.utime(entry)
+    # Same contents may be cached under another design name
+    params["Design"] = Path(fcstd).resolve().stem
+    with open(Path(log_dir) / PARAMS_FILE, "w") as f:
+        json.dump(params, f, indent=4)
+    return True
+
+
+def link_entry(source: Path, target: Path) -> None:
+    """Fill empty target directory with hard links to the files of an entry."""
+    for file in source.iterdir():
+        try:
+            os.link(file, target / file.name)
+        except OSError:
+            shutil.copyfile(file, target / file.name)
+
+
+def store(
+    cache_dir: str,
+    keys: List[str],
+    fcstd: str,
+    inp_file: str,
+    params: Dict,
+    max_size: int,
+) -> None:
+    """Store .inp file, simulation parameters and design under given keys.
+
+    Keyword arguments:
+    cache_dir -- path to cache directory
+    keys -- cache keys of the entry
+    fcstd -- path to FreeCAD design file
+    inp_file -- path to generated .inp file
+    params -- simulation parameters
+    max_size -- maximum size of the cache [bytes]
+    """
+    cache_path = Path(cache_dir)
+    cache_path.mkdir(parents=True, exist_ok=True)
+    # Entry is complete before it appears under its key
+    tmp = Path(tempfile.mkdtemp(dir=cache_path, prefix=".tmp"))
+    try:
+        shutil.copyfile(inp_file, tmp / Path(inp_file).name)
+        shutil.copyfile(fcstd, tmp / DESIGN_FILE)
+        with open(tmp / PARAMS_FILE, "w") as f:
+            json.dump(params, f, indent=4)
+        for key in dict.fromkeys(keys):
+            entry = cache_path / key
+            if entry.exists():
+                continue
+            staged = Path(tempfile.mkdtemp(dir=cache_path, prefix=f".tmp{key}"))
+            link_entry(tmp, staged)
+            try:
+                os.replace(staged, entry)
+            except OSError:
+                # Stored by a concurrent run meanwhile
+                shutil.rmtree(staged, ignore_errors=True)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    evict(cache_dir, max_size)
+
+
+def get_size(entries: List[Path]) -> int:
+    """Get size of entries [bytes], hard linked files are counted once."""
+    files = {}
+    for entry in entries:
+        for file in entry.iterdir():
+            stat = file.stat()
+            files[(stat.st_dev, stat.st_ino)] = stat.st_size
+    return sum(files.values())
+
+
+def evict(cache_dir: str, max_size: int) -> None:
+    """Remove least recently used entries until the cache fits in max_size bytes.
+
+    Staged entries are skipped, unless left over by a crashed run.
+
+    Keyword arguments:
+    cache_dir -- path to cache directory
+    max_size -- maximum size of the cache [bytes]
+    """
+    entries = []
+    for entry in Path(cache_dir).iterdir():
+        if not entry.name.startswith(".tmp"):
+            entries.append(entry)
+        elif entry.stat().st_mtime < time.time() - STALE_AGE:
+            shutil.rmtree(entry, ignore_errors=True)
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    while entries and get_size(entries) > max_size:
+        entry = entries.pop(0)
+        shutil.rmtree(entry, ignore_errors=True)
+        logging.info(f"Evicted {entry.name} from .inp cache")
+
+
+def main(
+    fcstd: str,
+    inp: str,
+    log: str,
+    steady_state: bool = False,
+    cache_dir: str = ".",
+    cache_size: int = DEFAULT_SIZE,
+) -> None:
+    """Generate .inp and simulation.json like parse_fcstd.main, reusing cached ones.
+
+    Keyword arguments:
+    fcstd -- path to FreeCAD design file
+    inp -- directory of the generated .inp file
+    log -- directory of simulation.json
+    steady_state -- set up steady state instead of transient analysis
+    cache_dir -- path to .inp cache directory
+    cache_size -- maximum size of the cache [bytes]
+    """
+    inp_file = (Path(inp).resolve() / f"{JOB_NAME}.inp").as_posix()
+    key = get_design_key(fcstd, steady_state)
+    if restore(cache_dir, key, fcstd, inp_file, log):
+        logging.info(f"Restored {inp_file} from cache")
+        return
+
+    # FreeCAD is loaded only on a cache miss
+    from preprocessing import parse_fcstd
+
+    # Stale .inp must not be cached if writing a new one fails
+    Path(inp_file).unlink(missing_ok=True)
+    parse_fcstd.main(fcstd, inp, log, steady_state)
+    if not os.path.exists(inp_file):
+        raise Exception(f"FreeCAD did not generate {inp_file}")
+    with open(Path(log) / PARAMS_FILE, "r") as f:
+        params = json.load(f)
+    # Saved design differs from the original, it is cached under both
+    keys = [key, get_design_key(fcstd, steady_state)]
+    store(cache_dir, keys, fcstd, inp_file, params, cache_size)
@@ -1,12 +1,8 @@
-from preprocessing import report as report_parameters
-from preprocessing import bisection
-from preprocessing import calculate_coef
 import typer
 from typing_extensions import Annotated
 from typing import Optional
 from enum import Enum
 import logging
-import coloredlogs
 
 custom_level_styles = {
     "info": {"color": "white", "bold": False},
@@ -14,13 +10,22 @@ custom_level_styles = {
     "error": {"color": "red", "bold": False},
 }
 
-coloredlogs.install(
-    level="INFO", level_styles=custom_level_styles, fmt="%(message)s", encoding="utf-8"
-)
-
 app = typer.Typer(help="Preprocessing utilities")
 
 
+@app.callback()
+def setup_logging():
+    # Imported here, so --help does not wait for it
+    import coloredlogs
+
+    coloredlogs.install(
+        level="INFO",
+        level_styles=custom_level_styles,
+        fmt="%(message)s",
+        encoding="utf-8",
+    )
+
+
 @app.command(help="Generate report.md")
 def report(
     sim: str = typer.Option(
@@ -32,6 +37,7 @@ def report(
     ),
     report_dir: str = typer.Option(".", help="Path to report directory"),
 ):
+    from preprocessing import report as report_parameters
 
     report_parameters.main(sim, config, report_dir)
 
@@ -41,10 +47,25 @@ def parse_fcstd(
     fcstd: str = typer.Option(..., help="Path to freecad design file (.fcstd)"),
     inp: str = typer.Option(".", help="Path to simulation input file (.inp)"),
     log: str = typer.Option(".", help="Path to simulation log file (.json)"),
+    steady_state: bool = typer.Option(
+        False, help="Set up steady state instead of transient analysis"
+    ),
+    cache_dir: Optional[str] = typer.Option(
+        None,
+        envvar="TPRE_CACHE_DIR",
+        help="Reuse .inp files generated for the same design and setup. "
+        "A hit replacing the design with the cached solver setup backs it up to .FCBak",
+    ),
+    cache_size: int = typer.Option(1024, help="Maximum size of the .inp cache [MB]"),
 ):
+    if cache_dir:
+        from preprocessing import inp_cache
+
+        inp_cache.main(fcstd, inp, log, steady_state, cache_dir, cache_size << 20)
+        return
     from preprocessing import parse_fcstd
 
-    parse_fcstd.main(fcstd, inp, log)
+    parse_fcstd.main(fcstd, inp, log, steady_state)
 
 
 class Orientation(str, Enum):
@@ -60,9 +81,11 @@ def calc_coef(
     temp_surface: float = typer.Option(..., help="Estimated surface temperature [°C]"),
     length: float = typer.Option(..., help="Characteristic length [mm]"),
 ):
-    coef = calculate_coef.calculate_film_coefficient(
-        temp_fluid, temp_surface, orientation, length
-    )
+    from preprocessing import calculate_coef
+
+    coef = calculate_coef.calculate_film_coefficients(
+        temp_fluid, temp_surface, orientation.value, length
+    ).item()
     logging.info(f"Film coefficient = {coef}")
 
 
@@ -97,12 +120,96 @@ def calc_film_coefs(
     parse_fcstd.calc_film_coefs(fcstd, config)
 
 
+@app.command(help="Calculate film coefficients and patch them in .inp, without FreeCAD")
+def patch_inp(
+    inp: str = typer.Option("FEMMeshGmsh.inp", help="Simulation input file (.inp)"),
+    config: str = typer.Option("config.json", help="Config file path (.json)"),
+):
+    from preprocessing import patch_inp
+
+    patch_inp.main(inp, config)
+
+
+class RootFinder(str, Enum):
+    bisection = "bisection"
+    secant = "secant"
+    illinois = "illinois"
+    iqi = "iqi"
+
+
 @app.command(help="Update temperature boundaries in config file")
 def bisect_temperature(
     config: str = typer.Option("config.json", help="Config file path (.json)"),
     csv: str = typer.Option("temperature.csv", help="CSV file path"),
+    method: RootFinder = typer.Option(
+        RootFinder.bisection, help="Method choosing the next temperature"
+    ),
+):
+    from preprocessing import bisection
+
+    bisection.bisect_temperature(config, csv, method.value)
+
+
+bisect_app = typer.Typer(help="Find film coefficients with bisection")
+app.add_typer(bisect_app, name="bisect")
+
+
+@bisect_app.command(
+    "run", help="Run all bisection iterations in a single process (see find_coef.sh)"
+)
+def bisect_run(
+    fcstd: str = typer.Option(..., help="FCStd file path"),
+    designs: str = typer.Option(
+        ".", help="Directory for .inp, results and simulation.json"
+    ),
+    config: str = typer.Option("config.json", help="Config file path (.json)"),
+    max_iterations: int = typer.Option(20, help="Maximum number of iterations"),
+    method: RootFinder = typer.Option(
+        RootFinder.bisection, help="Method choosing the next temperature"
+    ),
+    early_stop: bool = typer.Option(
+        False, help="Stop CalculiX once the outcome of the iteration is decided"
+    ),
+    steady_state: bool = typer.Option(
+        False, help="Run iterations as steady state and the converged one as transient"
+    ),
+    parallel: int = typer.Option(
+        1, help="Temperatures simulated at once in every round (k-section)"
+    ),
+    cores: Optional[int] = typer.Option(
+        None, help="Cores split between parallel CalculiX jobs (all by default)"
+    ),
+    patch_inp: bool = typer.Option(
+        False, help="Patch film coefficients in .inp instead of regenerating it"
+    ),
 ):
-    bisection.bisect_temperature(config, csv)
+    from preprocessing import find_coef
+
+    if parallel > 1:
+        if patch_inp:
+            logging.warning("--patch-inp is not supported with --parallel, ignoring")
+        result = find_coef.run_parallel(
+            fcstd,
+            designs,
+            config,
+            parallel,
+            cores,
+            max_iterations,
+            early_stop,
+            steady_state,
+        )
+    else:
+        result = find_coef.run(
+            fcstd,
+            designs,
+            config,
+            max_iterations,
+            method.value,
+            early_stop,
+            steady_state,
+            patch_inp,
+        )
+    raise typer.Exit(code=result)
 
 
 def main():
@@ -5,8 +5,9 @@ import json
 import subprocess
 import logging
 from pathlib import Path
-from preprocessing.calculate_coef import calculate_film_coefficient
+from preprocessing.calculate_coef import lookup_film_coefficients
 from preprocessing.common import get_config
+from preprocessing.bisection import get_candidate_temperature
 from contextlib import redirect_stdout
 from typing import Dict
 
@@ -91,71 +92,112 @@ def generate_inp(inp: str) -> None:
                 fea.write_inp_file()
         logging.info("Successfully generated the .inp file.")
     else:
-        logging.error(f"Prerequisite check failed: {message}")
+        raise Exception(f"Prerequisite check failed: {message}")
 
 
-def set_coef(fcstd: str, coef_type: str, coef_value: float, coef_name: str) -> None:
-    """Save coef with given type and value to .FCStd."""
-    doc = open_fcstd(fcstd)
-    # Check if requested name exists in constraints
-    if coef_name:
-        match_count = 0
-        for obj in doc.Objects:
-            if obj.TypeId != "Fem::ConstraintHeatflux":
-                continue
-            if obj.Label == coef_name:
-                match_count += 1
-        if match_count == 0:
-            raise Exception(f"{coef_name} label not in heat flux objects")
-    # Set coefficients
-    for obj in doc.Objects:
-        if obj.TypeId == "Fem::ConstraintHeatflux":
-            if coef_name and obj.Label != coef_name:
-                continue
+class FcstdSession:
+    """Design opened once, with heat flux constraints indexed by label.
+
+    Used as a context manager, all changes are made in a single transaction
+    and the design is saved once on exit.
+    """
+
+    def __init__(self, fcstd: str, save: bool = True):
+        """Open design.
+
+        Keyword arguments:
+        fcstd -- path to FreeCAD design file
+        save -- save the design on exit
+        """
+        self.fcstd = fcstd
+        self.save = save
+        self.doc = open_fcstd(fcstd)
+        self.heat_flux: Dict[str, list] = {}
+        for obj in self.doc.Objects:
+            if obj.TypeId == "Fem::ConstraintHeatflux":
+                self.heat_flux.setdefault(obj.Label, []).append(obj)
+
+    def __enter__(self) -> "FcstdSession":
+        self.doc.openTransaction("Set coefficients")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is not None:
+            self.doc.abortTransaction()
+            return
+        self.doc.commitTransaction()
+        if self.save:
+            save_fcstd(self.doc, self.fcstd)
+
+    def set_coef(
+        self, coef_type: str, coef_value: float, coef_name: str | None = None
+    ) -> None:
+        """Set coef with given type and value, of all heat flux constraints by default.
+
+        Keyword arguments:
+        coef_type -- film or emissivity
+        coef_value -- film [W/m^2/K] or emissivity [ratio]
+        coef_name -- (optional) label of the heat flux constraint
+        """
+        if coef_name:
+            if coef_name not in self.heat_flux:
+                raise Exception(f"{coef_name} label not in heat flux objects")
+            objects = self.heat_flux[coef_name]
+        else:
+            objects = [obj for group in self.heat_flux.values() for obj in group]
+        for obj in objects:
             if coef_type == "film":
                 obj.ConstraintType = "Convection"
                 obj.FilmCoef = coef_value
             if coef_type == "emissivity":
                 obj.ConstraintType = "Radiation"
                 obj.Emissivity = coef_value
-    save_fcstd(doc, fcstd)
 
 
-def calc_film_coefs(fcstd: str, config_path: str) -> None:
-    """Calculate & set new film coefficients for the middle value of a given temperature range."""
-    # Get config temp
-    config = get_config(config_path)
+def set_coef(fcstd: str, coef_type: str, coef_value: float, coef_name: str) -> None:
+    """Save coef with given type and value to .FCStd."""
+    with FcstdSession(fcstd) as session:
+        session.set_coef(coef_type, coef_value, coef_name)
 
-    # Calculate coeffs for the middle value of temperature range
-    temp_mid: float = (
-        float(config["temperature"]["max"] + config["temperature"]["min"]) / 2
-    )
-    doc = open_fcstd(fcstd)
+
+def apply_film_coefs(session: FcstdSession, config: Dict) -> Dict[str, float]:
+    """Calculate & set film coefficients for the temperature assumed in the next simulation.
+
+    Returns calculated film coefficients by constraint label.
+    """
+    # Calculate coeffs for the next temperature (middle of the range for bisection)
+    temp_mid: float = get_candidate_temperature(config)
     # Conversion from Kelvin to Celsius
-    temp_initial = get_initial_temperature(doc) - 273.15
+    temp_initial = get_initial_temperature(session.doc) - 273.15
     logging.info("Calculating film coefficients...")
-    for coef_name in config["film"]:
-        film = calculate_film_coefficient(
-            temp_initial,
-            temp_mid,
-            config["film"][coef_name][1],
-            config["film"][coef_name][0],
-        )
-        set_coef(fcstd, "film", film, coef_name)
+    films = lookup_film_coefficients(temp_initial, temp_mid, config["film"])
+    for coef_name, film in films.items():
+        session.set_coef("film", film, coef_name)
         logging.info(f"{coef_name} = {film}")
+    return films
 
 
-def set_solver(doc: FreeCAD) -> Dict:
-    """Sets solver parameters & checks timings correctness."""
+def calc_film_coefs(fcstd: str, config_path: str) -> None:
+    """Calculate & set new film coefficients for the middle value of a given temperature range."""
+    config = get_config(config_path)
+    with FcstdSession(fcstd) as session:
+        apply_film_coefs(session, config)
+
+
+def set_solver(doc: FreeCAD, steady_state: bool = False) -> Dict:
+    """Sets solver parameters & checks timings correctness.
+
+    Steady state analysis computes only the final temperature distribution.
+    """
     solver_configuration = {}
     for obj in doc.Objects:
         if obj.TypeId != "Fem::FemSolverObjectPython":
             continue
         obj.AnalysisType = "thermomech"
         obj.ThermoMechType = "pure heat transfer"
-        obj.ThermoMechSteadyState = False
+        obj.ThermoMechSteadyState = steady_state
         min_required_steps = int(10000 * (obj.TimeEnd / obj.TimeMaximumStep))
-        if min_required_steps > obj.IterationsMaximum:
+        if not steady_state and min_required_steps > obj.IterationsMaximum:
             logging.info(f"Increased simulation increments to {min_required_steps}")
             obj.IterationsMaximum = min_required_steps
 
@@ -190,11 +232,8 @@ def get_material(doc: FreeCAD) -> Dict:
     return material
 
 
-def main(fcstd: str, inp: str, log: str) -> None:
-    inp_path = Path(inp).resolve()
-    log_path = Path(log).resolve()
-    doc = open_fcstd(fcstd)
-    # Get tools versions
+def get_tools_versions() -> Dict:
+    """Get FreeCAD and CalculiX versions."""
     freecad_version = FreeCAD.Version()
     freecad_version = f"{freecad_version[0]}.{freecad_version[1]}.{freecad_version[2]} @{freecad_version[7]}"
     ccx = subprocess.Popen(args=["ccx", "-v"], stdout=subprocess.PIPE)
@@ -204,23 +243,44 @@ def main(fcstd: str, inp: str, log: str) -> None:
         .removeprefix("\nThis is Version ")
         .removesuffix("\n\n")
     )
-    # Generate simulation.json
+    return {"FreeCad": freecad_version, "CalculiX": ccx_version}
+
+
+def get_simulation_params(
+    doc: FreeCAD, fcstd: str, tools: Dict, steady_state: bool = False
+) -> Dict:
+    """Set solver and collect simulation parameters saved in simulation.json."""
     params: Dict = {}
-    params["Solver Configuration"] = set_solver(doc)
+    params["Solver Configuration"] = set_solver(doc, steady_state)
     params["Design"] = Path(fcstd).resolve().stem
-    params["Tools"] = {"FreeCad": freecad_version, "CalculiX": ccx_version}
+    params["Tools"] = tools
     params["Heat Dissipation"] = get_heat_flux(doc)
     params["Heat Source"] = get_heat_source(doc)
     params["Material"] = get_material(doc)
     params["Initial Temperature"] = get_initial_temperature(doc)
+    return params
+
+
+def save_simulation_params(params: Dict, log: str) -> None:
+    """Save simulation parameters to simulation.json in the log directory."""
+    log_path = Path(log).resolve()
+    with open((log_path / "simulation.json").as_posix(), "w") as f:
+        json.dump(params, f, indent=4)
+
+
+def main(fcstd: str, inp: str, log: str, steady_state: bool = False) -> None:
+    inp_path = Path(inp).resolve()
+    with FcstdSession(fcstd) as session:
+        # Generate simulation.json
+        params = get_simulation_params(
+            session.doc, fcstd, get_tools_versions(), steady_state
+        )
 
-    save_fcstd(doc, fcstd)
     # Generate inp from updated .FCStd
     generate_inp(inp_path.as_posix())
 
     # Save simulation.json
-    with open((log_path / "simulation.json").as_posix(), "w") as f:
-        json.dump(params, f, indent=4)
+    save_simulation_params(params, log)
 
 
 if __name__ == "__main__":
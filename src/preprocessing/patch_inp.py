@@ -0,0 +1,133 @@
+import os
+import logging
+from pathlib import Path
+from typing import Dict, List, Tuple
+from preprocessing.bisection import get_candidate_temperature
+from preprocessing.calculate_coef import lookup_film_coefficients
+from preprocessing.common import get_config
+
+log = logging.getLogger(__name__)
+
+FILM_KEYWORD = "*FILM"
+INITIAL_KEYWORD = "*INITIAL CONDITIONS"
+# FreeCAD writes film coefficients in t/s^3/K (mm, tonne, s units)
+FILM_UNIT_FACTOR = 0.001
+
+
+def read_inp(inp: str) -> List[str]:
+    """Read lines of .inp file, line endings included."""
+    with open(inp, "r") as f:
+        return f.readlines()
+
+
+def write_inp(inp: str, lines: List[str]) -> None:
+    """Replace .inp file with given lines, the old file is kept on failure."""
+    tmp = Path(inp).with_suffix(".inp.tmp")
+    with open(tmp, "w") as f:
+        f.writelines(lines)
+    os.replace(tmp, inp)
+
+
+def index_films(lines: List[str]) -> Dict[str, List[Tuple[int, int]]]:
+    """Index *FILM cards by heat flux constraint label.
+
+    FreeCAD precedes every *FILM card with a "** <constraint label>" comment.
+    Returns ranges (start, end) of data lines of every label, end excluded.
+    """
+    index: Dict[str, List[Tuple[int, int]]] = {}
+    label = ""
+    film_label = ""
+    start = None
+    for number, line in enumerate(lines):
+        if line.startswith("**"):
+            label = line[2:].strip()
+            continue
+        if not line.startswith("*"):
+            continue
+        if start is not None:
+            index.setdefault(film_label, []).append((start, number))
+            start = None
+        if line.split(",")[0].strip().upper() == FILM_KEYWORD:
+            film_label = label
+            start = number + 1
+    if start is not None:
+        index.setdefault(film_label, []).append((start, len(lines)))
+    return index
+
+
+def get_initial_temperature(lines: List[str]) -> float:
+    """Get initial temperature [K] of *INITIAL CONDITIONS card.
+
+    FreeCAD writes the initial temperature constraint as the temperature of all
+    nodes, film coefficients calculated by parse-fcstd use it as fluid temperature.
+    """
+    found = False
+    for line in lines:
+        if line.startswith("**") or not line.strip():
+            continue
+        if line.startswith("*"):
+            keyword, _, parameters = line.partition(",")
+            found = keyword.strip().upper() == INITIAL_KEYWORD and (
+                "TYPE=TEMPERATURE" in parameters.replace(" ", "").upper()
+            )
+        elif found:
+            return float(line.split(",")[1])
+    raise Exception(f"No temperature {INITIAL_KEYWORD} card")
+
+
+def patch_films(
+    lines: List[str], index: Dict[str, List[Tuple[int, int]]], films: Dict
+) -> int:
+    """Replace film coefficients of indexed *FILM cards in lines.
+
+    Returns number of changed lines.
+
+    Keyword arguments:
+    lines -- lines of .inp file
+    index -- *FILM data line ranges by label, see index_films
+    films -- film coefficients [W/m^2/K] by constraint label
+    """
+    changed = 0
+    for label, film in films.items():
+        if label not in index:
+            raise Exception(f"{label} label not in *FILM cards")
+        value = f"{film * FILM_UNIT_FACTOR:.13G}"
+        for start, end in index[label]:
+            for number in range(start, end):
+                line = lines[number]
+                if not line.strip() or line.startswith("**"):
+                    continue
+                data = line.rstrip("\r\n")
+                fields = data.split(",")
+                fields[3] = value
+                lines[number] = ",".join(fields) + line[len(data) :]
+                changed += 1
+    return changed
+
+
+def get_films(
+    lines: List[str], index: Dict[str, List[Tuple[int, int]]], config: Dict
+) -> Dict[str, float]:
+    """Calculate film coefficients for the temperature assumed in the next simulation.
+
+    Fluid temperature is the initial temperature read from the .inp file,
+    the same as in parse_fcstd.apply_film_coefs, so FreeCAD is not needed.
+    """
+    for label in config["film"]:
+        if label not in index:
+            raise Exception(f"{label} label not in *FILM cards")
+    temp_fluid = get_initial_temperature(lines) - 273.15
+    temp_surface = get_candidate_temperature(config)
+    return lookup_film_coefficients(temp_fluid, temp_surface, config["film"])
+
+
+def main(inp: str, config_path: str) -> None:
+    """Patch film coefficients of .inp file for the temperature assumed in config."""
+    lines = read_inp(inp)
+    index = index_films(lines)
+    films = get_films(lines, index, get_config(config_path))
+    changed = patch_films(lines, index, films)
+    write_inp(inp, lines)
+    for label, film in films.items():
+        logging.info(f"{label} = {film}")
+    logging.info(f"Patched {changed} faces in {inp}")
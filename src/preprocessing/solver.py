@@ -0,0 +1,115 @@
+import subprocess
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Callable
+from preprocessing.common import JOB_NAME
+
+log = logging.getLogger(__name__)
+
+
+def get_environment(threads: int | None = None) -> dict[str, str]:
+    """Get environment of CalculiX process.
+
+    Keyword arguments:
+    threads -- (optional) number of CalculiX threads, inherited by default
+    """
+    env = dict(os.environ)
+    if threads is not None:
+        env["OMP_NUM_THREADS"] = str(threads)
+    return env
+
+
+def run_ccx(workdir: str, job: str = JOB_NAME, threads: int | None = None) -> Path:
+    """Run CalculiX on <workdir>/<job>.inp and return path to the result file.
+
+    Keyword arguments:
+    workdir -- directory with the .inp file, results are written next to it
+    job -- job name (.inp file name without extension)
+    threads -- (optional) number of CalculiX threads
+    """
+    job_path = Path(workdir).resolve() / job
+    process = subprocess.run(
+        args=["ccx", job_path.as_posix()],
+        cwd=job_path.parent,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env=get_environment(threads),
+    )
+    frd = job_path.with_suffix(".frd")
+    if process.returncode != 0 or not frd.exists():
+        raise Exception(f"CalculiX failed for {job_path}.inp")
+    return frd
+
+
+def run_ccx_supervised(
+    workdir: str,
+    should_stop: Callable[[list[float], list[float], float | None], str | None],
+    time_end: float | None = None,
+    interval: float = 1.0,
+    job: str = JOB_NAME,
+    threads: int | None = None,
+) -> Path:
+    """Run CalculiX, following its results and stopping it once should_stop decides.
+
+    Returns path to the result file, which holds the results written until the stop.
+
+    Keyword arguments:
+    workdir -- directory with the .inp file, results are written next to it
+    should_stop -- gets simulated time [s] and maximum temperature [°C] of every
+                   result so far and time_end, returns the reason to stop or None
+    time_end -- (optional) simulation end time [s], used to estimate saved time
+    interval -- time between checks of new results [s]
+    job -- job name (.inp file name without extension)
+    threads -- (optional) number of CalculiX threads
+    """
+    # Plain run_ccx does not load the result readers
+    from postprocessing.frd_reader import FrdParser
+    from postprocessing.monitor import FileFollower
+
+    job_path = Path(workdir).resolve() / job
+    frd = job_path.with_suffix(".frd")
+    # Results of the previous run must not be mistaken for the new ones
+    frd.unlink(missing_ok=True)
+    start = time.monotonic()
+    process = subprocess.Popen(
+        args=["ccx", job_path.as_posix()],
+        cwd=job_path.parent,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env=get_environment(threads),
+    )
+    follower = FileFollower(frd.as_posix())
+    parser = FrdParser()
+    times: list[float] = []
+    max_temps: list[float] = []
+    sim_time = 0.0
+    reason = None
+    while reason is None:
+        finished = process.poll() is not None
+        for line in follower.read_lines():
+            result = parser.feed(line)
+            if result is not None:
+                sim_time = result[0]
+                times.append(sim_time)
+                max_temps.append(float(result[1].max()) - 273.15)
+        if finished:
+            break
+        reason = should_stop(times, max_temps, time_end)
+        if reason is None:
+            time.sleep(interval)
+
+    elapsed = time.monotonic() - start
+    if reason is not None:
+        process.terminate()
+        process.wait()
+        message = f"Stopped CalculiX at {sim_time:g} s after {elapsed:.1f} s: {reason}"
+        if time_end and sim_time > 0:
+            # Assumes the remaining time steps take as long as the computed ones
+            saved = elapsed * (time_end - sim_time) / sim_time
+            message += f", saved about {saved:.0f} s"
+        logging.info(message)
+    elif process.returncode != 0 or not frd.exists():
+        raise Exception(f"CalculiX failed for {job_path}.inp")
+    return frd